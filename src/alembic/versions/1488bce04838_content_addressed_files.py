@@ -0,0 +1,28 @@
+"""Content addressed files
+
+Revision ID: 1488bce04838
+Revises: c780b5e9af5b
+Create Date: 2026-10-18 09:52:31.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1488bce04838'
+down_revision = 'c780b5e9af5b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('file', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_file_content_hash'), 'file', ['content_hash'], unique=False)
+    op.alter_column('file', 'file_size', existing_type=sa.Integer(), type_=sa.BigInteger(), existing_nullable=False)
+
+
+def downgrade():
+    op.alter_column('file', 'file_size', existing_type=sa.BigInteger(), type_=sa.Integer(), existing_nullable=False)
+    op.drop_index(op.f('ix_file_content_hash'), table_name='file')
+    op.drop_column('file', 'content_hash')
@@ -0,0 +1,41 @@
+"""Add lookup indexes
+
+Revision ID: c780b5e9af5b
+Revises: dd0ace2b6075
+Create Date: 2026-10-18 09:41:02.530716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c780b5e9af5b'
+down_revision = 'dd0ace2b6075'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Built CONCURRENTLY so that writes, to the ledger in particular, carry on
+    # meanwhile. That can't run inside a transaction. If a build fails it
+    # leaves an INVALID index behind, drop it before retrying.
+    with op.get_context().autocommit_block():
+        op.create_index(op.f('ix_user_username'), 'user', ['username'], unique=False, postgresql_concurrently=True)
+        op.create_index(op.f('ix_user_company_id'), 'user', ['company_id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_user_discord_id', 'user', ['discord_id'], unique=False, postgresql_where=sa.text('discord_id IS NOT NULL'), postgresql_concurrently=True)
+        op.create_index('ix_user_created_dt_id', 'user', ['created_dt', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index(op.f('ix_bank_company_id'), 'bank', ['company_id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_transaction_bank_id_status_created_dt', 'transaction', ['bank_id', 'status', 'created_dt', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_transaction_pending_bank_id', 'transaction', ['bank_id', 'created_dt'], unique=False, postgresql_where=sa.text("status = 'PENDING'"), postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_transaction_pending_bank_id', table_name='transaction', postgresql_concurrently=True)
+        op.drop_index('ix_transaction_bank_id_status_created_dt', table_name='transaction', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_bank_company_id'), table_name='bank', postgresql_concurrently=True)
+        op.drop_index('ix_user_created_dt_id', table_name='user', postgresql_concurrently=True)
+        op.drop_index('ix_user_discord_id', table_name='user', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_user_company_id'), table_name='user', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_user_username'), table_name='user', postgresql_concurrently=True)
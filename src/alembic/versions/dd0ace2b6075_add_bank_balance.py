@@ -0,0 +1,37 @@
+"""Add bank balance
+
+Revision ID: dd0ace2b6075
+Revises: 7d1686e8c8b0
+Create Date: 2026-10-18 09:12:40.118203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'dd0ace2b6075'
+down_revision = '7d1686e8c8b0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('bank', sa.Column('balance', sa.Float(), server_default='0', nullable=False))
+    # Backfill from the existing ledger
+    op.execute(
+        """
+        UPDATE bank SET balance = t.total
+        FROM (
+            SELECT bank_id, sum(amount) AS total
+            FROM transaction
+            WHERE status = 'APPROVED'
+            GROUP BY bank_id
+        ) AS t
+        WHERE bank.id = t.bank_id
+        """
+    )
+
+
+def downgrade():
+    op.drop_column('bank', 'balance')
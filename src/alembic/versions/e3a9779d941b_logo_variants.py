@@ -0,0 +1,31 @@
+"""Logo variants
+
+Revision ID: e3a9779d941b
+Revises: 1488bce04838
+Create Date: 2026-10-18 09:42:27.242475
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a9779d941b'
+down_revision = '1488bce04838'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('file', sa.Column('original_id', postgresql.UUID(as_uuid=True), nullable=True))
+    op.add_column('file', sa.Column('variant_size', sa.Integer(), nullable=True))
+    op.create_unique_constraint('file_original_id_variant_size_key', 'file', ['original_id', 'variant_size'])
+    op.create_foreign_key('file_original_id_fkey', 'file', 'file', ['original_id'], ['id'], ondelete='CASCADE')
+
+
+def downgrade():
+    op.drop_constraint('file_original_id_fkey', 'file', type_='foreignkey')
+    op.drop_constraint('file_original_id_variant_size_key', 'file', type_='unique')
+    op.drop_column('file', 'variant_size')
+    op.drop_column('file', 'original_id')
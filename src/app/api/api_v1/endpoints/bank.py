@@ -1,30 +1,33 @@
-from typing import Any, List
+from typing import Any, List, Optional
 
-from fastapi import APIRouter, Body, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import uuid
+from datetime import datetime
 
 from app import crud, models, schemas
 from app.api import deps
-from app.utils import RankEnum
+from app.utils import HistoryBucketEnum, RankEnum
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[schemas.Bank])
-def read_all_by_user(
-    db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_active_user),
+async def read_all_by_user(
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: schemas.Principal = Depends(deps.get_current_active_principal_async),
 ) -> Any:
     """
     Retrieve all banks attached to company by user
     """
-    company = crud.company.get(db=db, id=current_user.company_id)
-    if not company:
+    if not current_user.company_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User has no company"
         )
-    banks = crud.bank.get_all_by_company(db, company=company)
+    banks = await crud.bank_async.get_all_by_company(
+        db, company_id=current_user.company_id
+    )
     if not banks:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -34,16 +37,16 @@ def read_all_by_user(
 
 
 @router.get("/{id}", response_model=schemas.Bank)
-def read_bank(
+async def read_bank(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_db),
     id: uuid.UUID,
-    current_user: models.User = Depends(deps.get_current_active_user),
+    current_user: schemas.Principal = Depends(deps.get_current_active_principal_async),
 ) -> Any:
     """
     Get bank by id
     """
-    bank = crud.bank.get(db=db, id=id)
+    bank = await crud.bank_async.get(db=db, id=id)
     if not bank:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Bank not found."
@@ -61,6 +64,38 @@ def read_bank(
     return bank
 
 
+@router.get("/{id}/history", response_model=List[schemas.BankHistoryPoint])
+async def read_bank_history(
+    *,
+    db: AsyncSession = Depends(deps.get_async_db),
+    id: uuid.UUID,
+    bucket: HistoryBucketEnum = HistoryBucketEnum.DAY,
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    current_user: schemas.Principal = Depends(deps.get_current_active_principal_async),
+) -> Any:
+    """
+    Balance over time: the net approved amount and closing balance of each
+    day, week or month with activity, optionally limited to [from, to)
+    """
+    bank = await crud.bank_async.get(db=db, id=id)
+    if not bank:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Bank not found."
+        )
+    if current_user.company_id != bank.company_id:
+        raise HTTPException(
+            status_code=404, detail="User does not have access to that bank."
+        )
+    history = await crud.bank_async.get_history(
+        db, bank_id=bank.id, bucket=bucket, start=from_, end=to
+    )
+    return [
+        {"start": start, "net": net, "balance": balance}
+        for start, net, balance in history
+    ]
+
+
 @router.post("/", response_model=schemas.Bank)
 def create_bank(
     *,
@@ -71,7 +106,7 @@ def create_bank(
     """
     Create new bank
     """
-    if not current_user.company:
+    if not current_user.company_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User has no company"
         )
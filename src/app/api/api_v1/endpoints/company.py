@@ -1,11 +1,24 @@
-from typing import Any, List
+from typing import Any, List, Optional
 
-from fastapi import APIRouter, Body, Depends, HTTPException, status
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Body,
+    Depends,
+    File,
+    HTTPException,
+    Query,
+    UploadFile,
+    status,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import uuid
 
 from app import crud, models, schemas
 from app.api import deps
+from app.api.files import REVALIDATE_CACHE_CONTROL, ContentFileResponse
+from app.core import images, storage
 from app.utils import RankEnum
 
 router = APIRouter()
@@ -44,17 +57,45 @@ def create_company(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User already belongs to a company",
         )
-    company = crud.company.create(db=db, obj_in=company_in)
+    # One unit of work: the company insert and the user's new rank and
+    # company are flushed together by the final commit
+    company = crud.company.create(db=db, obj_in=company_in, commit=False)
     if not company:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred.",
         )
-    crud.user.update_rank(db=db, db_obj=current_user, rank=RankEnum.GOVERNOR)
+    crud.user.update_rank(
+        db=db, db_obj=current_user, rank=RankEnum.GOVERNOR, commit=False
+    )
     company = crud.company.add_user(db=db, db_obj=company, user=current_user)
     return company
 
 
+@router.get("/summary", response_model=schemas.CompanySummary)
+async def read_company_summary(
+    *,
+    db: AsyncSession = Depends(deps.get_async_db),
+    recent: int = Query(10, ge=0, le=100),
+    current_user: schemas.Principal = Depends(deps.get_current_active_principal_async),
+) -> Any:
+    """
+    Dashboard summary of the company of user: its banks with pending totals,
+    members per rank and the `recent` latest transactions
+    """
+    summary = None
+    if current_user.company_id:
+        summary = await crud.company_async.get_summary(
+            db, company_id=current_user.company_id, recent=recent
+        )
+    if not summary:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User does not have an associated company",
+        )
+    return summary
+
+
 @router.put("/{id}", response_model=schemas.Company)
 def update_company(
     *,
@@ -85,6 +126,68 @@ def update_company(
     return company
 
 
+@router.get("/{id}/logo", response_class=ContentFileResponse)
+async def read_logo(
+    *,
+    db: AsyncSession = Depends(deps.get_async_db),
+    id: uuid.UUID,
+    size: Optional[int] = Query(None, gt=0),
+    current_user: schemas.Principal = Depends(deps.get_current_active_principal_async),
+) -> Any:
+    """
+    Download company logo, or its smallest resized variant of at least `size`
+    pixels when one exists.
+
+    What this URL serves changes with a new upload, and again once the
+    variants are rendered, so clients revalidate it by ETag every time.
+    """
+    logo = await crud.file_async.get_logo_of_company(db, company_id=id)
+    if not logo or not logo.content_hash:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Company has no logo."
+        )
+    if size is not None:
+        logo = await crud.file_async.get_variant(db, original=logo, size=size) or logo
+    return ContentFileResponse(
+        storage.path_for(logo.content_hash),
+        logo.content_hash,
+        filename=logo.file_name,
+        cache_control=REVALIDATE_CACHE_CONTROL,
+    )
+
+
+@router.put("/{id}/logo", response_model=schemas.File)
+def upload_logo(
+    *,
+    db: Session = Depends(deps.get_db),
+    id: uuid.UUID,
+    file: UploadFile = File(...),
+    background_tasks: BackgroundTasks,
+    current_user: models.User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Upload company logo
+    """
+    company = crud.company.get(db=db, id=id)
+    if not company:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Company does not exist."
+        )
+    if current_user.company_id != id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User does not have permissions for this company.",
+        )
+    if not current_user.rank or current_user.rank.value < RankEnum.GOVERNOR.value:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User does not have rank of GOVERNOR.",
+        )
+    logo = crud.file.create(db=db, file=file, company=company)
+    background_tasks.add_task(images.generate_logo_variants, logo.id, logo.content_hash)
+    return logo
+
+
 @router.delete("/{id}", response_model=schemas.Company)
 def delete_company(
     *,
@@ -0,0 +1,39 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+import uuid
+
+from app import crud, schemas
+from app.api import deps
+from app.api.files import ContentFileResponse
+from app.core import storage
+
+router = APIRouter()
+
+
+@router.get("/{id}", response_class=ContentFileResponse)
+async def download_file(
+    *,
+    db: AsyncSession = Depends(deps.get_async_db),
+    id: uuid.UUID,
+    current_user: schemas.Principal = Depends(deps.get_current_active_principal_async),
+) -> Any:
+    """
+    Download file by id.
+
+    Every stored file is a company logo or one of its resized variants, and
+    like GET /company/{id}/logo they are readable by any signed in user. Check
+    ownership here before storing anything private.
+    """
+    file = await crud.file_async.get(db, id=id)
+    if not file or not file.content_hash:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="File not found."
+        )
+    return ContentFileResponse(
+        storage.path_for(file.content_hash),
+        file.content_hash,
+        filename=file.file_name,
+        attachment=True,
+    )
@@ -3,8 +3,8 @@ from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from starlette_discord import DiscordOAuthClient
 from starlette.responses import RedirectResponse
 
 from app import crud, models, schemas
@@ -15,18 +15,16 @@ from app.core.config import settings
 router = APIRouter()
 
 
-discord_client = DiscordOAuthClient(
-    settings.DISCORD_CLIENT_ID, settings.DISCORD_SECRET_KEY, settings.DISCORD_REDIRECT
-)
-
 # Discord login
 @router.get("/discord-login")
-async def start_login():
+async def start_login(discord_client: Any = Depends(deps.get_discord_client)):
     return discord_client.redirect()
 
 
 @router.get("/callback", response_model=schemas.Token)
-async def finish_login(code: str):
+async def finish_login(
+    code: str, discord_client: Any = Depends(deps.get_discord_client)
+):
     discord_user = await discord_client.login(code)
     user = crud.user.get_by_discord_id(discord_user.id)
     if not user:
@@ -45,13 +43,14 @@ async def finish_login(code: str):
 
 
 @router.post("/login/access-token", response_model=schemas.Token)
-def login_access_token(
-    db: Session = Depends(deps.get_db), form_data: OAuth2PasswordRequestForm = Depends()
+async def login_access_token(
+    db: AsyncSession = Depends(deps.get_async_db),
+    form_data: OAuth2PasswordRequestForm = Depends(),
 ) -> Any:
     """
     OAuth2 compatible token login, get an access token for future requests
     """
-    user = crud.user.authenticate(
+    user = await crud.user_async.authenticate(
         db, username=form_data.username, password=form_data.password
     )
     if not user:
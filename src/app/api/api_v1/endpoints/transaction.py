@@ -1,73 +1,153 @@
 from app.utils import StatusEnum
-from typing import Any, List
+from typing import Any, List, Optional
 
 from fastapi import APIRouter, Body, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
 import uuid
 
 from app import crud, models, schemas
 from app.api import deps
-from app.utils import RankEnum
+from app.core.config import settings
+from app.api.rows import RowEncoder, RowsResponse
+from app.api.streaming import csv_stream, ndjson_stream
+from app.crud.base import next_cursor
+from app.db.session import AsyncSessionLocal
+from app.utils import ExportFormatEnum, RankEnum
 
 router = APIRouter()
 
+EXPORT_COLUMNS = [
+    "id",
+    "created_dt",
+    "updated_dt",
+    "bank_id",
+    "amount",
+    "status",
+    "creator_id",
+    "approver_id",
+]
 
-@router.get("/", response_model=List[schemas.Transaction])
-def get_multi_approved(
-    db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_active_user),
-    *skip: int,
-    limit: int,
+transaction_rows = RowEncoder(schemas.Transaction)
+
+
+@router.get("/", response_model=schemas.TransactionPage)
+async def get_multi_approved(
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: schemas.Principal = Depends(deps.get_current_active_principal_async),
+    cursor: Optional[str] = None,
+    limit: int = 100,
 ) -> Any:
     """
     Return approved transactions for company (spanning banks)
     """
-    if not current_user.company:
+    if not current_user.company_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User does not have a company"
         )
-    transactions = crud.transaction.get_multi_by_company_scoped(
-        db=db,
-        company=current_user.company,
-        scope=StatusEnum.APPROVED,
-        skip=skip,
-        limit=limit,
+    try:
+        transactions = await crud.transaction_async.get_multi_by_company_scoped(
+            db=db,
+            company_id=current_user.company_id,
+            scope=StatusEnum.APPROVED,
+            cursor=cursor,
+            limit=limit,
+            columns=transaction_rows.columns,
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor."
+        )
+    return RowsResponse(
+        {
+            "items": transaction_rows.encode(transactions),
+            "next_cursor": next_cursor(transactions, limit),
+        }
     )
-    return transactions
 
 
-@router.get("/{scope}", response_model=List[schemas.Transaction])
-def get_multi_pending(
+@router.get("/export")
+async def export_transactions(
+    format: ExportFormatEnum = ExportFormatEnum.CSV,
+    scope: Optional[StatusEnum] = None,
+    current_user: schemas.Principal = Depends(deps.get_current_active_principal_async),
+) -> Any:
+    """
+    Stream the company's transaction history (optionally one status only) as
+    CSV or newline delimited JSON
+    """
+    if not current_user.company_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="User does not have a company"
+        )
+
+    async def rows():
+        # The stream outlives the request's dependencies, so it gets its own
+        # session
+        async with AsyncSessionLocal() as db:
+            async for row in crud.transaction_async.stream_by_company(
+                db,
+                company_id=current_user.company_id,
+                columns=EXPORT_COLUMNS,
+                scope=scope,
+            ):
+                yield row
+
+    if format is ExportFormatEnum.NDJSON:
+        return StreamingResponse(
+            ndjson_stream(rows(), EXPORT_COLUMNS), media_type="application/x-ndjson"
+        )
+    return StreamingResponse(
+        csv_stream(rows(), EXPORT_COLUMNS),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="transactions.csv"'},
+    )
+
+
+@router.get("/{scope}", response_model=schemas.TransactionPage)
+async def get_multi_pending(
     scope: StatusEnum,
-    db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_active_user),
-    *skip: int,
-    limit: int,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: schemas.Principal = Depends(deps.get_current_active_principal_async),
+    cursor: Optional[str] = None,
+    limit: int = 100,
 ) -> Any:
     """
     Return pending transactions for company (spanning banks)
     """
-    if not current_user.company:
+    if not current_user.company_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User does not have a company"
         )
-    transactions = crud.transaction.get_multi_by_company_scoped(
-        db=db,
-        company=current_user.company,
-        scope=scope,
-        skip=skip,
-        limit=limit,
+    try:
+        transactions = await crud.transaction_async.get_multi_by_company_scoped(
+            db=db,
+            company_id=current_user.company_id,
+            scope=scope,
+            cursor=cursor,
+            limit=limit,
+            columns=transaction_rows.columns,
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor."
+        )
+    return RowsResponse(
+        {
+            "items": transaction_rows.encode(transactions),
+            "next_cursor": next_cursor(transactions, limit),
+        }
     )
-    return transactions
 
 
 @router.get("/{bank_id}", response_model=List[schemas.Transaction])
-def get_all_by_bank(
+async def get_all_by_bank(
     bank_id: uuid.UUID,
-    db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_active_user),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: schemas.Principal = Depends(deps.get_current_active_principal_async),
 ) -> Any:
-    bank = crud.bank.get(db=db, id=bank_id)
+    bank = await crud.bank_async.get(db=db, id=bank_id)
     if not bank:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Bank ID does not exist"
@@ -77,20 +157,23 @@ def get_all_by_bank(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User does not have access to that bank.",
         )
-    transactions = crud.transaction.get_all_by_bank_scoped(
-        db=db, bank=bank, scope=StatusEnum.APPROVED
+    transactions = await crud.transaction_async.get_all_by_bank_scoped(
+        db=db,
+        bank_id=bank.id,
+        scope=StatusEnum.APPROVED,
+        columns=transaction_rows.columns,
     )
-    return transactions
+    return RowsResponse(transaction_rows.encode(transactions))
 
 
 @router.get("/{bank_id}/{scope}", response_model=List[schemas.Transaction])
-def get_all_by_bank(
+async def get_all_by_bank(
     bank_id: uuid.UUID,
     scope: StatusEnum,
-    db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_active_user),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: schemas.Principal = Depends(deps.get_current_active_principal_async),
 ) -> Any:
-    bank = crud.bank.get(db=db, id=bank_id)
+    bank = await crud.bank_async.get(db=db, id=bank_id)
     if not bank:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Bank ID does not exist"
@@ -100,19 +183,19 @@ def get_all_by_bank(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User does not have access to that bank.",
         )
-    transactions = crud.transaction.get_all_by_bank_scoped(
-        db=db, bank=bank, scope=scope
+    transactions = await crud.transaction_async.get_all_by_bank_scoped(
+        db=db, bank_id=bank.id, scope=scope, columns=transaction_rows.columns
     )
-    return transactions
+    return RowsResponse(transaction_rows.encode(transactions))
 
 
 @router.get("/{id}", response_model=schemas.Transaction)
-def get_transaction(
+async def get_transaction(
     id: uuid.UUID,
-    db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_active_user),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: schemas.Principal = Depends(deps.get_current_active_principal_async),
 ) -> Any:
-    transaction = crud.transaction.get(db=db, id=id)
+    transaction = await crud.transaction_async.get_with_bank(db=db, id=id)
     if not transaction:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Transaction does not exist"
@@ -125,6 +208,35 @@ def get_transaction(
     return transaction
 
 
+@router.post("/bulk", response_model=List[schemas.Transaction])
+def create_transactions_bulk(
+    *,
+    db: Session = Depends(deps.get_db),
+    transactions_in: List[schemas.TransactionBulkCreate],
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Create many transactions, possibly across several banks, in one commit
+    """
+    if len(transactions_in) > settings.TRANSACTION_BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.TRANSACTION_BULK_MAX_ROWS} transactions per request.",
+        )
+    bank_ids = {transaction.bank_id for transaction in transactions_in}
+    if not current_user.company_id or bank_ids - crud.bank.get_ids_in_company(
+        db=db, ids=bank_ids, company_id=current_user.company_id
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User does not belong to every bank's company.",
+        )
+    transactions = crud.transaction.create_bulk(
+        db=db, obj_in=transactions_in, creator=current_user
+    )
+    return transactions
+
+
 @router.post("/{bank_id}", response_model=schemas.Transaction)
 def create_transaction(
     *,
@@ -147,11 +259,44 @@ def create_transaction(
             detail="User does not belong to that bank's company.",
         )
     transaction = crud.transaction.create(
-        db=db, obj_in=transaction_in, creator=current_user
+        db=db, obj_in=transaction_in, bank_id=bank_id, creator=current_user
     )
     return transaction
 
 
+@router.put("/approve", response_model=schemas.TransactionApproveResult)
+def approve_transactions(
+    *,
+    db: Session = Depends(deps.get_db),
+    approve_in: schemas.TransactionApprove,
+    current_user: models.User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Approve many pending transactions of the user's company in one statement
+    """
+    if len(approve_in.ids) > settings.TRANSACTION_BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.TRANSACTION_BULK_MAX_ROWS} transactions per request.",
+        )
+    if not current_user.rank or current_user.rank.value < RankEnum.CONSUL.value:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User must be CONSUL or greater to approve.",
+        )
+    if not current_user.company_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="User does not have a company"
+        )
+    approved, not_pending, not_found = crud.transaction.approve(
+        db=db,
+        ids=approve_in.ids,
+        company_id=current_user.company_id,
+        approver=current_user,
+    )
+    return {"approved": approved, "not_pending": not_pending, "not_found": not_found}
+
+
 @router.put("/{id}", response_model=schemas.Transaction)
 def update_transaction(
     *,
@@ -163,13 +308,14 @@ def update_transaction(
     """
     Update Transaction
     """
-    transaction = crud.transaction.get(db=db, id=id)
+    transaction = crud.transaction.get(
+        db=db, id=id, options=[joinedload(models.Transaction.bank)]
+    )
     if not transaction:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Transaction does not exist."
         )
-    bank = crud.bank.get(db=db, id=transaction.bank_id)
-    if current_user.company_id != bank.company_id:
+    if current_user.company_id != transaction.bank.company_id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User does not have access to that company's transactions.",
@@ -197,25 +343,28 @@ def approve_transaction(
     id: uuid.UUID,
     current_user: models.User = Depends(deps.get_current_user),
 ) -> Any:
-    transaction = crud.transaction.get(db=db, id=id)
-    if not transaction:
+    if not current_user.rank or current_user.rank.value < RankEnum.CONSUL.value:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Transaction does not exist."
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User must be CONSUL or greater to approve.",
         )
-    if current_user.company_id != transaction.bank.company_id:
+    if not current_user.company_id:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="User does not have access to that company's transactions.",
+            status_code=status.HTTP_404_NOT_FOUND, detail="User does not have a company"
         )
-    if current_user.rank.value < RankEnum.CONSUL.value:
+    approved, not_pending, _ = crud.transaction.approve(
+        db=db, ids=[id], company_id=current_user.company_id, approver=current_user
+    )
+    if not_pending:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="User must be CONSUL or greater to approve.",
+            detail="Transaction is not pending.",
         )
-    transaction = crud.transaction.approve(
-        db=db, db_obj=transaction, approver=current_user
-    )
-    return transaction
+    if not approved:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Transaction does not exist."
+        )
+    return approved[0]
 
 
 @router.delete("/{id}", response_model=schemas.Transaction)
@@ -225,7 +374,9 @@ def delete_transaction(
     id: uuid.UUID,
     current_user: models.User = Depends(deps.get_current_user),
 ) -> Any:
-    transaction = crud.transaction.get(db=db, id=id)
+    transaction = crud.transaction.get(
+        db=db, id=id, options=[joinedload(models.Transaction.bank)]
+    )
     if not transaction:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Transaction does not exist."
@@ -248,3 +399,5 @@ def delete_transaction(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User must be CONSUL or greater to approve.",
         )
+    transaction = crud.transaction.remove(db=db, id=id)
+    return transaction
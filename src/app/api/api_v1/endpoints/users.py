@@ -1,32 +1,38 @@
-from typing import Any, List
+from typing import Any, List, Optional
 
 from fastapi import APIRouter, Body, Depends, HTTPException, status
 from fastapi.encoders import jsonable_encoder
 from pydantic.networks import EmailStr
 from sqlalchemy.orm import Session
-from starlette_discord import DiscordOAuthClient
 import uuid
 
 from app import crud, models, schemas
 from app.api import deps
-from app.core.config import settings
+from app.crud.base import next_cursor
 from app.utils import RankEnum
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[schemas.User])
+@router.get("/", response_model=schemas.UserPage)
 def read_users(
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     current_user: models.User = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """
-    Retrieve users.
+    Retrieve users. Pass the returned `next_cursor` back as `cursor` to get
+    the next page.
     """
-    users = crud.user.get_multi(db, skip=skip, limit=limit)
-    return users
+    try:
+        users = crud.user.get_multi(db, skip=skip, limit=limit, cursor=cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor."
+        )
+    return {"items": users, "next_cursor": next_cursor(users, limit)}
 
 
 @router.post("/", response_model=schemas.User)
@@ -74,9 +80,8 @@ def update_user_me(
 
 
 @router.get("/me", response_model=schemas.User)
-def read_user_me(
-    db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_active_user),
+async def read_user_me(
+    current_user: models.User = Depends(deps.get_current_active_user_async),
 ) -> Any:
     """
     Get current user.
@@ -137,7 +142,7 @@ def update_rank(
     if rank.value == RankEnum.GOVERNOR.value:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot promote to governor, try transfer of ownership.")
     user = crud.user.get(db=db, id=user_id)
-    if not user or not user.company:
+    if not user or not user.company_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Company or user not found."
         )
@@ -156,16 +161,12 @@ def update_rank(
 
 
 # Link Discord Account
-discord_client = DiscordOAuthClient(
-    settings.DISCORD_CLIENT_ID, settings.DISCORD_SECRET_KEY, settings.DISCORD_REDIRECT
-)
-
-# Discord login
 @router.get("/link-discord", response_model=schemas.User)
 async def link_discord(
     *,
     db: Session = Depends(deps.get_db),
     current_user: models.User = Depends(deps.get_current_active_user),
+    discord_client: Any = Depends(deps.get_discord_client),
 ):
     return discord_client.redirect()
 
@@ -175,6 +176,7 @@ async def finish_link(
     code: str,
     db: Session = Depends(deps.get_db),
     current_user: models.User = Depends(deps.get_current_active_user),
+    discord_client: Any = Depends(deps.get_discord_client),
 ):
     discord_user = await discord_client.login(code)
     user = crud.user.update(
@@ -1,5 +1,9 @@
-from typing import Generator
+from functools import lru_cache
+from typing import TYPE_CHECKING, AsyncGenerator, Generator
+import hashlib
+import time
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import Session
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
@@ -7,10 +11,14 @@ from jose import jwt
 from pydantic import ValidationError
 
 from app import crud, models, schemas
-from app.db.session import SessionLocal
+from app.db.session import AsyncSessionLocal, SessionLocal
 from app.core import security
+from app.core.cache import principal_cache, token_cache
 from app.core.config import settings
 
+if TYPE_CHECKING:
+    from starlette_discord import DiscordOAuthClient
+
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/login/access-token"
@@ -25,19 +33,55 @@ def get_db() -> Generator:
         db.close()
 
 
-def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(reusable_oauth2)
-) -> models.User:
+async def get_async_db() -> AsyncGenerator:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+@lru_cache()
+def get_discord_client() -> "DiscordOAuthClient":
+    """
+    OAuth client shared by the Discord login and account linking routes,
+    created on first use. starlette_discord pulls in aiohttp, which would
+    otherwise be a large part of the app's import time.
+    """
+    from starlette_discord import DiscordOAuthClient
+
+    return DiscordOAuthClient(
+        settings.DISCORD_CLIENT_ID,
+        settings.DISCORD_SECRET_KEY,
+        settings.DISCORD_REDIRECT,
+    )
+
+
+def get_token_data(token: str) -> schemas.TokenPayload:
+    """
+    Claims of a valid access token. Clients reuse a token for days, so the
+    verified claims are cached until it expires.
+    """
+    key = hashlib.sha256(token.encode()).digest()
+    token_data = token_cache.get(key)
+    if token_data is not None:
+        return token_data
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
-        )
+        payload = security.decode_access_token(token)
         token_data = schemas.TokenPayload(**payload)
     except (jwt.JWTError, ValidationError) as e:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
+    ttl = settings.TOKEN_CACHE_TTL
+    if "exp" in payload:
+        ttl = min(ttl, payload["exp"] - time.time())
+    token_cache.set(key, token_data, ttl=ttl)
+    return token_data
+
+
+def get_current_user(
+    db: Session = Depends(get_db), token: str = Depends(reusable_oauth2)
+) -> models.User:
+    token_data = get_token_data(token)
     user = crud.user.get(db, id=token_data.sub)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -60,3 +104,47 @@ def get_current_active_superuser(
             status_code=400, detail="The user doesn't have enough privileges"
         )
     return current_user
+
+
+async def get_current_user_async(
+    db: AsyncSession = Depends(get_async_db), token: str = Depends(reusable_oauth2)
+) -> models.User:
+    token_data = get_token_data(token)
+    user = await crud.user_async.get(db, id=token_data.sub)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+
+async def get_current_active_user_async(
+    current_user: models.User = Depends(get_current_user_async),
+) -> models.User:
+    if not crud.user.is_active(current_user):
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return current_user
+
+
+async def get_current_principal_async(
+    db: AsyncSession = Depends(get_async_db), token: str = Depends(reusable_oauth2)
+) -> schemas.Principal:
+    """
+    Identity of the current user, served from the principal cache when
+    possible so that auth needs no database work.
+    """
+    token_data = get_token_data(token)
+    principal = principal_cache.get(token_data.sub)
+    if principal is None:
+        user = await crud.user_async.get(db, id=token_data.sub)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        principal = schemas.Principal.from_orm(user)
+        principal_cache.set(user.id, principal)
+    return principal
+
+
+async def get_current_active_principal_async(
+    current_user: schemas.Principal = Depends(get_current_principal_async),
+) -> schemas.Principal:
+    if not crud.user.is_active(current_user):
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return current_user
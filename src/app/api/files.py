@@ -0,0 +1,203 @@
+from typing import List, Optional, Tuple
+from urllib.parse import quote
+import mimetypes
+import os
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from app.core import images
+
+mimetypes.add_type("image/webp", images.VARIANT_EXTENSION)
+
+# Stored content never changes under its hash, so clients may keep what a
+# URL naming the file itself returns forever
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+# For URLs whose file can change, such as a company's current logo: clients
+# keep the content but check the ETag before each use
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a `Range: bytes=...` header into an inclusive (start, end) pair.
+
+    Returns None when the header should be ignored and the whole file served,
+    which includes multi-range requests. Raises RangeNotSatisfiable when the
+    range lies outside the file.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if not first:
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length <= 0:
+                raise RangeNotSatisfiable()
+            return max(size - length, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start < 0 or (last and start > end):
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """
+    Weak comparison of an If-None-Match header against `etag`
+    """
+    if header.strip() == "*":
+        return True
+    tags: List[str] = [tag.strip() for tag in header.split(",")]
+    return any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in tags)
+
+
+class ContentFileResponse(Response):
+    """
+    Serve a file from content-addressed storage.
+
+    The strong ETag is the content hash, so conditional requests are answered
+    with a 304 without touching the disk. Responses are cacheable forever
+    unless `cache_control` says otherwise, which it must when the same URL
+    may later serve other content. Single byte ranges are honoured.
+    The body goes out with sendfile when the server offers the ASGI zerocopy
+    extension. Otherwise it is read in chunks with pread on the threadpool,
+    so the whole file is never held in memory.
+    """
+
+    chunk_size = 64 * 1024
+
+    def __init__(
+        self,
+        path: str,
+        content_hash: str,
+        *,
+        filename: Optional[str] = None,
+        media_type: Optional[str] = None,
+        attachment: bool = False,
+        cache_control: str = IMMUTABLE_CACHE_CONTROL,
+    ) -> None:
+        self.path = path
+        self.etag = f'"{content_hash}"'
+        self.status_code = 200
+        self.background = None
+        if media_type is None:
+            media_type = mimetypes.guess_type(filename or path)[0]
+        self.media_type = media_type or "application/octet-stream"
+        self.base_headers = {
+            "etag": self.etag,
+            "cache-control": cache_control,
+            "accept-ranges": "bytes",
+            # Uploaded content is served with a guessed type; don't let
+            # browsers second guess it into something executable
+            "x-content-type-options": "nosniff",
+        }
+        self.raw_headers = []
+        if filename is not None:
+            disposition = "attachment" if attachment else "inline"
+            self.base_headers[
+                "content-disposition"
+            ] = f"{disposition}; filename*=utf-8''{quote(filename)}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request_headers = Headers(scope=scope)
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None and etag_matches(if_none_match, self.etag):
+            await self._send_head(send, 304, {})
+            return
+
+        try:
+            file = open(self.path, "rb")
+        except FileNotFoundError:
+            await Response(status_code=404)(scope, receive, send)
+            return
+        with file:
+            size = os.fstat(file.fileno()).st_size
+            start, end = 0, size - 1
+            status_code = 200
+            headers = {"content-type": self.media_type}
+
+            range_header = request_headers.get("range")
+            if_range = request_headers.get("if-range")
+            if range_header and (if_range is None or if_range == self.etag):
+                try:
+                    byte_range = parse_range(range_header, size)
+                except RangeNotSatisfiable:
+                    await self._send_head(
+                        send,
+                        416,
+                        {"content-range": f"bytes */{size}", "content-length": "0"},
+                    )
+                    return
+                if byte_range is not None:
+                    start, end = byte_range
+                    status_code = 206
+                    headers["content-range"] = f"bytes {start}-{end}/{size}"
+
+            count = end - start + 1
+            headers["content-length"] = str(count)
+            await self._send_head(send, status_code, headers, more_body=True)
+            if scope["method"] == "HEAD":
+                await send({"type": "http.response.body", "body": b""})
+            elif "http.response.zerocopy" in scope.get("extensions", {}):
+                await send(
+                    {
+                        "type": "http.response.zerocopy",
+                        "file": file,
+                        "offset": start,
+                        "count": count,
+                    }
+                )
+            else:
+                await self._send_chunks(send, file.fileno(), start, count)
+
+    async def _send_head(
+        self, send: Send, status_code: int, headers: dict, more_body: bool = False
+    ) -> None:
+        self.raw_headers = [
+            (key.encode("latin-1"), value.encode("latin-1"))
+            for key, value in {**self.base_headers, **headers}.items()
+        ]
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        if not more_body:
+            await send({"type": "http.response.body", "body": b""})
+
+    async def _send_chunks(self, send: Send, fd: int, offset: int, count: int) -> None:
+        remaining = count
+        while remaining > 0:
+            chunk = await run_in_threadpool(
+                os.pread, fd, min(self.chunk_size, remaining), offset
+            )
+            if not chunk:
+                break
+            offset += len(chunk)
+            remaining -= len(chunk)
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": remaining > 0,
+                }
+            )
+        if remaining > 0 or not count:
+            await send({"type": "http.response.body", "body": b""})
@@ -0,0 +1,36 @@
+from typing import Any, Dict, Iterable, List, Sequence, Type
+
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+import orjson
+
+
+class RowEncoder:
+    """
+    Fast path for list endpoints. With a response_model, FastAPI validates
+    every ORM object through Pydantic and then runs jsonable_encoder over the
+    result. An endpoint can instead select `columns` as plain rows, turn them
+    into dicts with `encode` and return them in a RowsResponse, which writes
+    UUIDs, datetimes and enums natively.
+
+    The columns are the schema's fields in declaration order, so the JSON has
+    the same shape as the schema's. Keep the response_model on the route so
+    the OpenAPI docs still describe it.
+    """
+
+    def __init__(self, schema: Type[BaseModel]) -> None:
+        self.columns: Sequence[str] = tuple(schema.__fields__)
+
+    def encode(self, rows: Iterable[Sequence[Any]]) -> List[Dict[str, Any]]:
+        columns = self.columns
+        return [dict(zip(columns, row)) for row in rows]
+
+
+class RowsResponse(ORJSONResponse):
+    """
+    ORJSONResponse that also accepts the driver's own value types, such as
+    the UUIDs asyncpg returns for projected columns, by writing them as strings
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=str)
@@ -0,0 +1,62 @@
+from datetime import datetime
+from enum import Enum
+from typing import Any, AsyncIterator, Dict, Sequence
+import csv
+import io
+import json
+
+
+def _text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return str(value)
+
+
+def _json(value: Any) -> Any:
+    if value is None or isinstance(value, (int, float, str, bool)):
+        return value
+    return _text(value)
+
+
+async def csv_stream(
+    rows: AsyncIterator[Sequence], columns: Sequence[str], chunk_rows: int = 1000
+) -> AsyncIterator[str]:
+    """
+    Render row tuples as CSV with a header, yielding a chunk every
+    `chunk_rows` rows so the first bytes go out before the query finishes.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    count = 0
+    async for row in rows:
+        writer.writerow([_text(value) for value in row])
+        count += 1
+        if count % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+async def ndjson_stream(
+    rows: AsyncIterator[Sequence], columns: Sequence[str], chunk_rows: int = 1000
+) -> AsyncIterator[str]:
+    """
+    Render row tuples as newline delimited JSON objects keyed by `columns`
+    """
+    lines = []
+    async for row in rows:
+        record: Dict[str, Any] = {
+            column: _json(value) for column, value in zip(columns, row)
+        }
+        lines.append(json.dumps(record))
+        if len(lines) == chunk_rows:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
@@ -0,0 +1,73 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+import threading
+import time
+
+from app.core.config import settings
+
+
+class TTLCache:
+    """
+    Thread-safe LRU mapping bounded to `maxsize` entries, each of which expires
+    `ttl` seconds after it was set. Counts hits and misses for monitoring.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] <= now:
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
+
+
+# Authenticated principals keyed by user id (the token subject). Each worker
+# has its own copy, so changes made through another worker only show up once
+# the entry expires.
+principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL
+)
+
+# Verified claims of access tokens keyed by the token's SHA-256 digest, so
+# requests reusing a token skip the signature check. Entries never outlive the
+# token's exp, and reload_keyring() clears them all.
+token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL)
+
+# Balance history of the closed (past) buckets keyed by (bank id, bucket).
+# Writes dated inside a closed bucket drop the entry in the worker making
+# them; other workers pick the change up once it expires.
+bank_history_cache = TTLCache(
+    maxsize=settings.BANK_HISTORY_CACHE_SIZE, ttl=settings.BANK_HISTORY_CACHE_TTL
+)
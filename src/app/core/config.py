@@ -13,7 +13,62 @@ class Settings(BaseSettings):
     API_V1_STR: str = "/api/v1"
     FILE_STORAGE_ROUTE: str = os.path.abspath("app") + "/files/"
     SECRET_KEY: str = secrets.token_urlsafe(32)
+    # JWT signing keys by key id, as a JSON object ('{"2024-06": "<secret>"}')
+    # and/or a JSON file of the same shape, merged with JWT_KEYS winning.
+    # Tokens are signed with the JWT_ACTIVE_KID key and verified with any key
+    # in the ring. A SECRET_KEY set explicitly joins the ring as "default".
+    # With no keys at all a random SECRET_KEY is used, which differs per
+    # process and so only works with a single worker.
+    JWT_KEYS: Dict[str, str] = {}
+    JWT_KEYS_FILE: Optional[str] = None
+    JWT_ACTIVE_KID: Optional[str] = None
+    # Worker processes the Procfile starts; more than one requires keys
+    WEB_CONCURRENCY: int = 1
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7 days in minutes
+    PRINCIPAL_CACHE_SIZE: int = 10_000
+    PRINCIPAL_CACHE_TTL: int = 60  # seconds
+    # Verified access token claims, kept until the token expires or TTL
+    TOKEN_CACHE_SIZE: int = 10_000
+    TOKEN_CACHE_TTL: int = 60 * 60  # seconds
+    # Closed buckets of bank balance history, per bank and bucket size. Only
+    # the worker handling a backdated change drops its entry, so the TTL is
+    # how long other workers may serve history that disagrees with the
+    # stored balance.
+    BANK_HISTORY_CACHE_SIZE: int = 10_000
+    BANK_HISTORY_CACHE_TTL: int = 60  # seconds
+
+    # Password hashing. Workers is the size of the bcrypt process pool (0 runs
+    # it inline); past MAX_PENDING queued operations requests get a 503.
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    PASSWORD_HASH_RETRY_AFTER: int = 1  # seconds
+
+    TRANSACTION_BULK_MAX_ROWS: int = 10_000
+
+    # Square sizes in pixels of the logo variants rendered after an upload,
+    # and the size of the process pool rendering them (0 renders inline).
+    LOGO_VARIANT_SIZES: List[int] = [32, 64, 256]
+    LOGO_VARIANT_WORKERS: int = 1
+
+    # Connection pools. These apply to each engine (sync and async) of each
+    # worker process, so one process may hold up to
+    # 2 * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections. PRE_PING checks each
+    # connection with a round trip on checkout; RECYCLE (seconds, -1 never)
+    # replaces connections older than that instead. STATEMENT_TIMEOUT is in
+    # milliseconds, 0 for none.
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30  # seconds
+    DB_POOL_RECYCLE: int = -1
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT: int = 0
+    # SQLMODEL_DATABASE_URI points at PgBouncer in transaction mode: the sync
+    # engine keeps no pool of its own and sends no startup parameters, so set
+    # the statement timeout on the database role instead. asyncpg needs named
+    # prepared statements, so ASYNC_DATABASE_URI must be given and connect to
+    # Postgres directly.
+    DB_PGBOUNCER: bool = False
     SERVER_NAME: str
     SERVER_HOST: AnyHttpUrl
 
@@ -48,6 +103,22 @@ class Settings(BaseSettings):
             path=f"/{values.get('POSTGRES_DB') or ''}",
         )
 
+    ASYNC_DATABASE_URI: Optional[str] = None
+
+    @validator("ASYNC_DATABASE_URI", pre=True)
+    def assemble_async_db_connection(
+        cls, v: Optional[str], values: Dict[str, Any]
+    ) -> Any:
+        if isinstance(v, str):
+            return v
+        if values.get("DB_PGBOUNCER"):
+            raise ValueError("must connect to Postgres directly with DB_PGBOUNCER")
+        uri = values.get("SQLMODEL_DATABASE_URI")
+        # Missing when SQLMODEL_DATABASE_URI failed its own validation
+        if not uri or "://" not in uri:
+            return None
+        return "postgresql+asyncpg://" + uri.split("://", 1)[1]
+
     FIRST_SUPERUSER: str
     FIRST_SUPERUSER_PASSWORD: str
     USERS_OPEN_REGISTRATION: bool = False
@@ -0,0 +1,96 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Optional, Sequence, Tuple
+import io
+import logging
+import multiprocessing
+import threading
+import uuid
+
+from app.core import storage
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+VARIANT_FORMAT = "WEBP"
+VARIANT_EXTENSION = ".webp"
+VARIANT_QUALITY = 80
+
+# Decoding and resampling images is CPU bound and can take a while for large
+# uploads, so it runs on its own process pool after the upload has returned.
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.LOGO_VARIANT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def render_variants(
+    content_hash: str, sizes: Sequence[int]
+) -> Dict[int, Tuple[str, int]]:
+    """
+    Resize the stored image to fit in a square of each of `sizes` pixels,
+    recompress it and store the result.
+
+    Returns the content hash and byte size of each variant keyed by size.
+    """
+    from PIL import Image
+
+    variants = {}
+    with Image.open(storage.path_for(content_hash)) as original:
+        # Let JPEG decode at a reduced scale; the largest variant is plenty
+        original.draft("RGB", (max(sizes), max(sizes)))
+        original.load()
+        source = original.convert("RGBA")
+    for size in sorted(sizes, reverse=True):
+        # Shrink from the previous (larger) variant rather than the original
+        source.thumbnail((size, size), Image.LANCZOS)
+        output = io.BytesIO()
+        source.save(output, VARIANT_FORMAT, quality=VARIANT_QUALITY, method=6)
+        output.seek(0)
+        variants[size] = storage.store(output)
+    return variants
+
+
+def submit_variants(content_hash: str) -> "Future[Dict[int, Tuple[str, int]]]":
+    """
+    Schedule rendering of the configured logo variants. Runs inline and
+    returns a completed future when LOGO_VARIANT_WORKERS is 0.
+    """
+    sizes = settings.LOGO_VARIANT_SIZES
+    if not settings.LOGO_VARIANT_WORKERS:
+        future: Future = Future()
+        try:
+            future.set_result(render_variants(content_hash, sizes))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+    return _get_executor().submit(render_variants, content_hash, sizes)
+
+
+def generate_logo_variants(file_id: uuid.UUID, content_hash: str) -> None:
+    """
+    Render the resized variants of an uploaded logo on the image pool and
+    record them. Meant to run as a background task once the upload response
+    has gone out; content that isn't a readable image gets no variants.
+    """
+    # Imported here, the pool's workers import this module and need neither
+    from app import crud
+    from app.db.session import SessionLocal
+
+    try:
+        variants = submit_variants(content_hash).result()
+    except Exception:
+        logger.warning("Could not render variants of file %s", file_id, exc_info=True)
+        return
+    with SessionLocal() as db:
+        original = crud.file.get(db, id=file_id)
+        if original:
+            crud.file.create_variants(db, original=original, variants=variants)
@@ -0,0 +1,348 @@
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import threading
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, Pool, QueuePool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (statistic, type, help) of the pool statistics in /metrics
+POOL_METRICS = [
+    ("size", "gauge", "Connections the pool keeps open."),
+    ("checked_out", "gauge", "Connections currently checked out."),
+    ("overflow", "gauge", "Connections open beyond the pool size."),
+    ("checkouts", "counter", "Connection checkouts."),
+    ("waits", "counter", "Checkouts that found the pool exhausted and waited."),
+    ("timeouts", "counter", "Checkouts that gave up after the pool timeout."),
+    ("checkout_seconds", "counter", "Time spent checking out connections."),
+]
+
+# Route label of requests that matched no route, so stray URLs can't grow the
+# number of series without bound
+UNMATCHED_ROUTE = "unmatched"
+
+
+class RequestMetrics:
+    """
+    What one request spent outside its own code. The engine hooks and the
+    password hashing helpers add to the instance of the current request.
+    """
+
+    __slots__ = ("statements", "db_seconds", "pool_wait_seconds", "bcrypt_seconds")
+
+    def __init__(self) -> None:
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+        self.bcrypt_seconds = 0.0
+
+    def server_timing(self, total_seconds: float) -> str:
+        return (
+            f"app;dur={total_seconds * 1000:.3f}, "
+            f'db;dur={self.db_seconds * 1000:.3f};desc="{self.statements} statements", '
+            f"pool;dur={self.pool_wait_seconds * 1000:.3f}, "
+            f"bcrypt;dur={self.bcrypt_seconds * 1000:.3f}"
+        )
+
+
+class RouteMetrics:
+    """
+    Totals over every request to one route
+    """
+
+    __slots__ = (
+        "requests",
+        "latency_buckets",
+        "latency_seconds",
+        "statements",
+        "db_seconds",
+        "pool_wait_seconds",
+        "bcrypt_seconds",
+    )
+
+    def __init__(self) -> None:
+        self.requests = 0
+        # Per bucket (not cumulative) counts, the last one is +Inf
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_seconds = 0.0
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+        self.bcrypt_seconds = 0.0
+
+    def observe(self, seconds: float, request: RequestMetrics) -> None:
+        self.requests += 1
+        self.latency_buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.latency_seconds += seconds
+        self.statements += request.statements
+        self.db_seconds += request.db_seconds
+        self.pool_wait_seconds += request.pool_wait_seconds
+        self.bcrypt_seconds += request.bcrypt_seconds
+
+
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar(
+    "request_metrics", default=None
+)
+# Keyed by (method, route template). Only touched from the event loop thread,
+# by the middleware and the /metrics endpoint, so it needs no lock.
+_routes: Dict[Tuple[str, str], RouteMetrics] = {}
+_engines: Dict[str, Engine] = {}
+
+
+def current() -> Optional[RequestMetrics]:
+    """
+    Metrics of the request being served, None outside of one
+    """
+    return _current.get()
+
+
+def record_bcrypt(seconds: float) -> None:
+    request = _current.get()
+    if request is not None:
+        request.bcrypt_seconds += seconds
+
+
+def record_pool_wait(seconds: float) -> None:
+    request = _current.get()
+    if request is not None:
+        request.pool_wait_seconds += seconds
+
+
+def reset() -> None:
+    _routes.clear()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    if context is not None:
+        context._metrics_start = perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    request = _current.get()
+    if request is not None and context is not None:
+        request.statements += 1
+        request.db_seconds += perf_counter() - context._metrics_start
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """
+    Count the statements `engine` runs, and the time they take, against the
+    current request, and publish its pool statistics under `name`. Pass the
+    sync_engine of an AsyncEngine.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    _engines[name] = engine
+
+
+def pool_stats(pool: Pool) -> Dict[str, float]:
+    """
+    Live statistics of an instrumented pool. Queue pools also report their
+    size, connections checked out and overflow in use.
+    """
+    stats: Dict[str, float] = {
+        "checkouts": getattr(pool, "checkouts", 0),
+        "waits": getattr(pool, "waits", 0),
+        "timeouts": getattr(pool, "timeouts", 0),
+        "checkout_seconds": getattr(pool, "checkout_seconds", 0.0),
+    }
+    if isinstance(pool, QueuePool):
+        stats["size"] = pool.size()
+        stats["checked_out"] = pool.checkedout()
+        stats["overflow"] = max(pool.overflow(), 0)
+    return stats
+
+
+class _InstrumentedPool:
+    """
+    Counts checkouts, the ones that had to wait for a connection to be
+    returned, and the ones that timed out. Checkout time, which includes
+    connecting and pre-ping, is added to the current request.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)  # type: ignore
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.checkout_seconds = 0.0
+        self._stats_lock = threading.Lock()
+
+    def _exhausted(self) -> bool:
+        return False
+
+    def connect(self) -> Any:
+        waited = self._exhausted()
+        timed_out = False
+        start = perf_counter()
+        try:
+            return super().connect()  # type: ignore
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            seconds = perf_counter() - start
+            with self._stats_lock:
+                self.checkouts += 1
+                self.waits += waited
+                self.timeouts += timed_out
+                self.checkout_seconds += seconds
+            record_pool_wait(seconds)
+
+
+class _InstrumentedQueuePoolBase(_InstrumentedPool):
+    def _exhausted(self) -> bool:
+        # No idle connection and no room to open another one
+        max_overflow = self._max_overflow  # type: ignore
+        return self.checkedin() == 0 and 0 <= max_overflow <= self.overflow()  # type: ignore
+
+
+class InstrumentedQueuePool(_InstrumentedQueuePoolBase, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(
+    _InstrumentedQueuePoolBase, AsyncAdaptedQueuePool
+):
+    pass
+
+
+class InstrumentedNullPool(_InstrumentedPool, NullPool):
+    pass
+
+
+class MetricsMiddleware:
+    """
+    Time every HTTP request, total up its SQL, pool and bcrypt time per route
+    template for /metrics, and report the same figures to the client in a
+    Server-Timing header.
+
+    Plain ASGI rather than BaseHTTPMiddleware, which would run the endpoint
+    in a separate task and buffer streaming responses.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self._templates: Dict[Callable, str] = {}
+
+    def _route(self, scope: Scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        template = self._templates.get(endpoint)
+        if template is None:
+            self._templates = {
+                route.endpoint: route.path
+                for route in scope["app"].routes
+                if hasattr(route, "endpoint")
+            }
+            template = self._templates.get(endpoint, UNMATCHED_ROUTE)
+        return template
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = RequestMetrics()
+        token = _current.set(request)
+        start = perf_counter()
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                timing = request.server_timing(perf_counter() - start)
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"server-timing", timing.encode("latin-1")),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = perf_counter() - start
+            _current.reset(token)
+            key = (scope["method"], self._route(scope))
+            route = _routes.get(key)
+            if route is None:
+                route = _routes[key] = RouteMetrics()
+            route.observe(elapsed, request)
+
+
+def _labels(method: str, route: str, **extra: str) -> str:
+    labels = {"method": method, "route": route, **extra}
+    return ",".join(
+        '{}="{}"'.format(
+            name,
+            value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+        )
+        for name, value in labels.items()
+    )
+
+
+def render() -> str:
+    """
+    Every route's totals in the Prometheus text exposition format
+    """
+    routes = sorted(_routes.items())
+    lines: List[str] = []
+
+    def counter(name: str, help: str, value: Callable[[RouteMetrics], Any]) -> None:
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} counter")
+        for (method, route), metrics in routes:
+            lines.append(f"{name}{{{_labels(method, route)}}} {value(metrics)}")
+
+    counter("http_requests_total", "Requests served.", lambda m: m.requests)
+
+    name = "http_request_duration_seconds"
+    lines.append(f"# HELP {name} Time to serve a request.")
+    lines.append(f"# TYPE {name} histogram")
+    for (method, route), metrics in routes:
+        cumulative = 0
+        for bound, count in zip(
+            [*map(str, LATENCY_BUCKETS), "+Inf"], metrics.latency_buckets
+        ):
+            cumulative += count
+            labels = _labels(method, route, le=bound)
+            lines.append(f"{name}_bucket{{{labels}}} {cumulative}")
+        labels = _labels(method, route)
+        lines.append(f"{name}_sum{{{labels}}} {metrics.latency_seconds}")
+        lines.append(f"{name}_count{{{labels}}} {metrics.requests}")
+
+    counter("db_statements_total", "SQL statements executed.", lambda m: m.statements)
+    counter(
+        "db_duration_seconds_total",
+        "Time spent executing SQL statements.",
+        lambda m: m.db_seconds,
+    )
+    counter(
+        "db_pool_wait_seconds_total",
+        "Time spent checking out database connections.",
+        lambda m: m.pool_wait_seconds,
+    )
+    counter(
+        "bcrypt_duration_seconds_total",
+        "Time spent waiting on password hashing and verification.",
+        lambda m: m.bcrypt_seconds,
+    )
+
+    pools = [
+        (name, pool_stats(engine.pool)) for name, engine in sorted(_engines.items())
+    ]
+    for key, kind, help in POOL_METRICS:
+        name = f"db_pool_{key}" + ("_total" if kind == "counter" else "")
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        for engine, stats in pools:
+            if key in stats:
+                lines.append(f'{name}{{engine="{engine}"}} {stats[key]}')
+    return "\n".join(lines) + "\n"
@@ -1,16 +1,187 @@
+from concurrent.futures import Future, ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union
+from time import perf_counter
+from typing import Any, Callable, Dict, Optional, Union
+import asyncio
+import json
+import logging
+import multiprocessing
+import threading
 
 from jose import jwt
 from passlib.context import CryptContext, CryptPolicy
 
-from app.core.config import settings
+from app.core import metrics
+from app.core.cache import token_cache
+from app.core.config import Settings, settings
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS
+)
+
+logger = logging.getLogger(__name__)
 
 ALGORITHM = "HS256"
 
+# Key id of SECRET_KEY in the keyring. Tokens issued before there was a
+# keyring have no kid header and are verified with it.
+DEFAULT_KID = "default"
+
+
+class Keyring:
+    """
+    HMAC keys by key id. Tokens are signed with the active key and name it in
+    their kid header, and are verified with whichever key they name, so that
+    any worker or node sharing the ring accepts any other's tokens and keys
+    can be rotated without logging everyone out.
+    """
+
+    def __init__(self, keys: Dict[str, str], active_kid: str) -> None:
+        if active_kid not in keys:
+            raise ValueError(f"Active JWT key {active_kid!r} is not in the keyring")
+        empty = [kid for kid, key in keys.items() if not key]
+        if empty:
+            raise ValueError(f"Empty JWT keys: {', '.join(sorted(empty))}")
+        self.keys = dict(keys)
+        self.active_kid = active_kid
+
+    def encode(self, claims: Dict[str, Any]) -> str:
+        return jwt.encode(
+            claims,
+            self.keys[self.active_kid],
+            algorithm=ALGORITHM,
+            headers={"kid": self.active_kid},
+        )
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        """
+        Verified claims of `token`. Raises jwt.JWTError when it is malformed,
+        expired, badly signed or signed with a key no longer in the ring.
+        """
+        kid = jwt.get_unverified_header(token).get("kid", DEFAULT_KID)
+        key = self.keys.get(kid)
+        if key is None:
+            raise jwt.JWTError(f"Unknown key id {kid!r}")
+        return jwt.decode(token, key, algorithms=[ALGORITHM])
+
+
+def load_keyring(config: Settings = settings) -> Keyring:
+    """
+    Keyring from JWT_KEYS_FILE, JWT_KEYS and SECRET_KEY of `config`
+    """
+    keys: Dict[str, str] = {}
+    if config.JWT_KEYS_FILE:
+        with open(config.JWT_KEYS_FILE) as f:
+            keys.update(json.load(f))
+    keys.update(config.JWT_KEYS)
+    if "SECRET_KEY" in config.__fields_set__ or not keys:
+        keys.setdefault(DEFAULT_KID, config.SECRET_KEY)
+    if not config.__fields_set__ & {"SECRET_KEY", "JWT_KEYS", "JWT_KEYS_FILE"}:
+        if config.WEB_CONCURRENCY > 1:
+            raise ValueError(
+                "Set SECRET_KEY, JWT_KEYS or JWT_KEYS_FILE to run several workers, "
+                "each would sign tokens with its own random key"
+            )
+        logger.warning(
+            "No JWT keys configured, tokens are signed with a random key of this "
+            "process and other workers will reject them"
+        )
+
+    active_kid = config.JWT_ACTIVE_KID
+    if active_kid is None:
+        if len(keys) > 1:
+            raise ValueError("JWT_ACTIVE_KID must be set when there are several keys")
+        (active_kid,) = keys
+    return Keyring(keys, active_kid)
+
+
+keyring = load_keyring()
+
+
+def reload_keyring(config: Settings = settings) -> Keyring:
+    """
+    Replace the keyring after the key configuration changed, and forget every
+    cached token so that ones signed with a removed key are rejected at once
+    """
+    global keyring
+    keyring = load_keyring(config)
+    token_cache.clear()
+    return keyring
+
+
+def decode_access_token(token: str) -> Dict[str, Any]:
+    return keyring.decode(token)
+
+
+class PasswordHasherBusy(Exception):
+    """
+    Raised when the password hashing pool already has as much queued work as
+    it is allowed to hold.
+    """
+
+
+# bcrypt is CPU bound by design. Running it on a small dedicated pool keeps a
+# burst of logins from occupying every threadpool worker (and core) that the
+# other endpoints need; past the queue limit callers are turned away instead.
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def _release(future: Future) -> None:
+    global _pending
+    with _pending_lock:
+        _pending -= 1
+
+
+def _submit(fn: Callable, *args: Any) -> Future:
+    global _pending
+    with _pending_lock:
+        if _pending >= settings.PASSWORD_HASH_MAX_PENDING:
+            raise PasswordHasherBusy()
+        _pending += 1
+    try:
+        future = _get_executor().submit(fn, *args)
+    except Exception:
+        with _pending_lock:
+            _pending -= 1
+        raise
+    future.add_done_callback(_release)
+    return future
+
+
+def ensure_password_capacity() -> None:
+    """
+    Fail fast with PasswordHasherBusy when the pool is already saturated, so
+    callers can reject a request before doing any other work for it.
+    """
+    if (
+        settings.PASSWORD_HASH_WORKERS
+        and _pending >= settings.PASSWORD_HASH_MAX_PENDING
+    ):
+        raise PasswordHasherBusy()
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
 
 def create_access_token(
     subject: Union[str, Any], expires_delta: timedelta = None
@@ -23,13 +194,46 @@ def create_access_token(
         )
 
     to_encode = {"exp": expire, "sub": str(subject)}
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+    return keyring.encode(to_encode)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    start = perf_counter()
+    try:
+        if not settings.PASSWORD_HASH_WORKERS:
+            return _verify(plain_password, hashed_password)
+        return _submit(_verify, plain_password, hashed_password).result()
+    finally:
+        metrics.record_bcrypt(perf_counter() - start)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    start = perf_counter()
+    try:
+        if not settings.PASSWORD_HASH_WORKERS:
+            return _hash(password)
+        return _submit(_hash, password).result()
+    finally:
+        metrics.record_bcrypt(perf_counter() - start)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    start = perf_counter()
+    try:
+        if not settings.PASSWORD_HASH_WORKERS:
+            return _verify(plain_password, hashed_password)
+        return await asyncio.wrap_future(
+            _submit(_verify, plain_password, hashed_password)
+        )
+    finally:
+        metrics.record_bcrypt(perf_counter() - start)
+
+
+async def get_password_hash_async(password: str) -> str:
+    start = perf_counter()
+    try:
+        if not settings.PASSWORD_HASH_WORKERS:
+            return _hash(password)
+        return await asyncio.wrap_future(_submit(_hash, password))
+    finally:
+        metrics.record_bcrypt(perf_counter() - start)
@@ -0,0 +1,50 @@
+from typing import BinaryIO, Tuple
+import hashlib
+import os
+import tempfile
+
+from app.core.config import settings
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def path_for(content_hash: str) -> str:
+    """
+    Location of the stored file with the given sha256 hex digest
+    """
+    return os.path.join(settings.FILE_STORAGE_ROUTE, content_hash[:2], content_hash)
+
+
+def store(source: BinaryIO) -> Tuple[str, int]:
+    """
+    Copy `source` into content-addressed storage in fixed size chunks, hashing
+    it on the way. The data is written to a temp file and atomically renamed
+    into place, or dropped if identical content is already stored.
+
+    Returns the sha256 hex digest and size in bytes.
+    """
+    os.makedirs(settings.FILE_STORAGE_ROUTE, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    # Same directory as the destination so the rename can't cross filesystems
+    fd, tmp_path = tempfile.mkstemp(dir=settings.FILE_STORAGE_ROUTE, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as output:
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                size += len(chunk)
+                output.write(chunk)
+            output.flush()
+            os.fsync(output.fileno())
+        content_hash = digest.hexdigest()
+        path = path_for(content_hash)
+        if os.path.exists(path):
+            os.unlink(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return content_hash, size
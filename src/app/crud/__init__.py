@@ -1,5 +1,5 @@
-from .bank import bank
-from .company import company
-from .file import file
-from .transaction import transaction
-from .user import user
+from .bank import bank, bank_async
+from .company import company, company_async
+from .file import file, file_async
+from .transaction import transaction, transaction_async
+from .user import user, user_async
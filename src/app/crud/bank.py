@@ -1,24 +1,80 @@
-from typing import Any, Dict, Optional, Union, List
+from typing import Any, Dict, Optional, Sequence, Set, Union, List, Tuple
 
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.interfaces import ORMOption
 import uuid
+from datetime import datetime, timedelta, timezone
 
-from app.core.security import get_password_hash, verify_password
+from app.core.cache import bank_history_cache
 from app.crud.base import CRUDBase
+from app.crud.base_async import AsyncCRUDBase
 from app.models.bank import Bank
+from app.models.transaction import Transaction
 from app.schemas.bank import BankCreate, BankUpdate
-from app.models.company import Company
-from app.models.user import User
+from app.utils import HistoryBucketEnum, StatusEnum
+
+# Float sums differ slightly depending on summation order
+BALANCE_TOLERANCE = 1e-6
+
+# (start, net, balance) of one bucket of balance history
+HistoryPoint = Tuple[datetime, float, float]
+
+
+def bucket_start(bucket: HistoryBucketEnum, dt: datetime) -> datetime:
+    """
+    Start of the bucket containing `dt`, matching Postgres' date_trunc
+    """
+    day = dt.replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket is HistoryBucketEnum.WEEK:
+        return day - timedelta(days=day.weekday())
+    if bucket is HistoryBucketEnum.MONTH:
+        return day.replace(day=1)
+    return day
+
+
+def naive_utc(dt: datetime) -> datetime:
+    """
+    `dt` as the naive UTC datetime the columns store
+    """
+    if dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
 
 
 class CRUDBank(CRUDBase[Bank, BankCreate, BankUpdate]):
-    def get_all_by_company(self, db: Session, *, company: Company) -> List[Bank]:
-        company = db.query(Company).filter(Company.id == company.id).first()
-        return company.banks
+    def get_all_by_company(
+        self,
+        db: Session,
+        *,
+        company_id: uuid.UUID,
+        options: Sequence[ORMOption] = (),
+    ) -> List[Bank]:
+        return (
+            db.query(Bank)
+            .options(*options)
+            .filter(Bank.company_id == company_id)
+            .order_by(Bank.created_dt)
+            .all()
+        )
+
+    def get_ids_in_company(
+        self, db: Session, *, ids: Set[uuid.UUID], company_id: uuid.UUID
+    ) -> Set[uuid.UUID]:
+        """
+        The subset of `ids` that are banks belonging to the company
+        """
+        rows = (
+            db.query(Bank.id)
+            .filter(Bank.id.in_(ids))
+            .filter(Bank.company_id == company_id)
+            .all()
+        )
+        return {id for id, in rows}
 
     def create(self, db: Session, *, obj_in: BankCreate, company_id: uuid.UUID) -> Bank:
-        db_item = Bank(**obj_in.dict(), company_id=company_id)
-        return super().create(db, obj_in=db_item)
+        return super().create(db, obj_in={**obj_in.dict(), "company_id": company_id})
 
     def update(
         self, db: Session, *, db_obj: Bank, obj_in: Union[BankUpdate, Dict[str, Any]]
@@ -29,5 +85,166 @@ class CRUDBank(CRUDBase[Bank, BankCreate, BankUpdate]):
             update_data = obj_in.dict(exclude_unset=True)
         return super().update(db, db_obj=db_obj, obj_in=update_data)
 
+    def add_to_balance(self, db: Session, *, bank_id: uuid.UUID, amount: float) -> None:
+        """
+        Apply `amount` to the stored balance without committing, so the change
+        lands in the same database transaction as the caller's write.
+        """
+        db.query(Bank).filter(Bank.id == bank_id).update(
+            {Bank.balance: Bank.balance + amount}, synchronize_session="fetch"
+        )
+
+    def invalidate_history(self, *, bank_id: uuid.UUID, created_dt: datetime) -> None:
+        """
+        Drop cached balance history that a change to the approved amount of a
+        transaction created at `created_dt` makes stale, which is only the
+        case when it falls in an already closed bucket.
+        """
+        now = datetime.utcnow()
+        for bucket in HistoryBucketEnum:
+            if created_dt < bucket_start(bucket, now):
+                bank_history_cache.invalidate((bank_id, bucket))
+
+    def reconcile_balances(
+        self,
+        db: Session,
+        *,
+        after_id: Optional[uuid.UUID] = None,
+        limit: int = 500,
+        repair: bool = False,
+    ) -> Tuple[List[Tuple[uuid.UUID, float, float]], Optional[uuid.UUID]]:
+        """
+        Recompute the balance of up to `limit` banks (ordered by id, starting
+        after `after_id`) from their approved transactions.
+
+        Returns the drifted banks as (id, stored, actual) and the id to resume
+        from, or None once every bank has been checked.
+        """
+        batch = db.query(Bank.id)
+        if after_id is not None:
+            batch = batch.filter(Bank.id > after_id)
+        batch = batch.order_by(Bank.id).limit(limit)
+        if repair:
+            # Hold the batch's bank rows so concurrent approvals wait for us
+            # instead of racing the recomputed totals.
+            batch = batch.with_for_update()
+        ids = [id for id, in batch.all()]
+        if not ids:
+            db.rollback()
+            return [], None
+
+        # Stored and recomputed balances come from one statement, and so one
+        # snapshot; an approval committing in between can't look like drift.
+        actual = (
+            select(func.sum(Transaction.amount))
+            .filter(Transaction.bank_id == Bank.id)
+            .filter(Transaction.status == StatusEnum.APPROVED)
+            .scalar_subquery()
+        )
+        rows = (
+            db.query(Bank.id, Bank.balance, func.coalesce(actual, 0.0))
+            .filter(Bank.id.in_(ids))
+            .order_by(Bank.id)
+            .all()
+        )
+        drift = []
+        for id, stored, actual in rows:
+            if abs(stored - actual) > BALANCE_TOLERANCE:
+                drift.append((id, stored, actual))
+        if repair and drift:
+            db.bulk_update_mappings(
+                Bank, [{"id": id, "balance": actual} for id, _, actual in drift]
+            )
+        db.commit()
+        next_id = ids[-1] if len(ids) == limit else None
+        return drift, next_id
+
+
+class AsyncCRUDBank(AsyncCRUDBase[Bank, BankCreate, BankUpdate]):
+    async def get_all_by_company(
+        self,
+        db: AsyncSession,
+        *,
+        company_id: uuid.UUID,
+        options: Sequence[ORMOption] = (),
+    ) -> List[Bank]:
+        result = await db.execute(
+            select(Bank)
+            .options(*options)
+            .filter(Bank.company_id == company_id)
+            .order_by(Bank.created_dt)
+        )
+        return result.scalars().all()
+
+    async def _history(
+        self,
+        db: AsyncSession,
+        *,
+        bank_id: uuid.UUID,
+        bucket: HistoryBucketEnum,
+        since: Optional[datetime] = None,
+    ) -> List[HistoryPoint]:
+        # Inlined rather than bound, so the select and GROUP BY expressions
+        # are identical; the value comes from the enum
+        start = func.date_trunc(
+            literal_column(f"'{bucket.value}'"), Transaction.created_dt
+        )
+        net = func.sum(Transaction.amount)
+        stmt = (
+            select(start, net, func.sum(net).over(order_by=start))
+            .filter(Transaction.bank_id == bank_id)
+            .filter(Transaction.status == StatusEnum.APPROVED)
+            .group_by(start)
+            .order_by(start)
+        )
+        if since is not None:
+            stmt = stmt.filter(Transaction.created_dt >= since)
+        result = await db.execute(stmt)
+        return [tuple(row) for row in result.all()]
+
+    async def get_history(
+        self,
+        db: AsyncSession,
+        *,
+        bank_id: uuid.UUID,
+        bucket: HistoryBucketEnum,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> List[HistoryPoint]:
+        """
+        Net approved amount and closing balance of every bucket with activity,
+        from the one containing `start` up to (excluding) `end`. Aware
+        datetimes are converted to UTC.
+
+        Once closed buckets are cached only the current bucket is aggregated.
+        A backdated change drops the cached buckets of this worker (see
+        CRUDBank.invalidate_history) but not of other workers, which may
+        serve the old figures for up to BANK_HISTORY_CACHE_TTL.
+        """
+        current = bucket_start(bucket, datetime.utcnow())
+        cached = bank_history_cache.get((bank_id, bucket))
+        if cached is not None and cached[0] == current:
+            closed = cached[1]
+            opening = closed[-1][2] if closed else 0.0
+            points = closed + [
+                (start_dt, net, opening + running)
+                for start_dt, net, running in await self._history(
+                    db, bank_id=bank_id, bucket=bucket, since=current
+                )
+            ]
+        else:
+            points = await self._history(db, bank_id=bank_id, bucket=bucket)
+            closed = [point for point in points if point[0] < current]
+            bank_history_cache.set((bank_id, bucket), (current, closed))
+
+        if start is not None:
+            first = bucket_start(bucket, naive_utc(start))
+            points = [point for point in points if point[0] >= first]
+        if end is not None:
+            end = naive_utc(end)
+            points = [point for point in points if point[0] < end]
+        return points
+
 
 bank = CRUDBank(Bank)
+bank_async = AsyncCRUDBank(Bank)
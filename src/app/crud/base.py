@@ -1,15 +1,81 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+from typing import (
+    Any,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
-from fastapi.encoders import jsonable_encoder
 from sqlmodel import SQLModel
-from sqlalchemy.orm import Session
+from sqlalchemy import inspect, tuple_
+from sqlalchemy.sql import Select
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.orm.interfaces import ORMOption
+import base64
+import binascii
 import uuid
+from datetime import datetime
 
 from app.models.base import Base
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=SQLModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=SQLModel)
+QueryType = TypeVar("QueryType", Query, Select)
+
+
+def encode_cursor(obj: Base) -> str:
+    """
+    Opaque keyset cursor pointing just after `obj` in (created_dt, id) order
+    """
+    raw = f"{obj.created_dt.isoformat()}|{obj.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    try:
+        created_dt, id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_dt), uuid.UUID(id)
+    except (ValueError, binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def next_cursor(items: List[Base], limit: int) -> Optional[str]:
+    """
+    Cursor for the page after `items`, or None if this was the last page
+    """
+    if len(items) < limit:
+        return None
+    return encode_cursor(items[-1])
+
+
+def keyset_page(
+    query: QueryType,
+    model: Type[Base],
+    *,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+) -> QueryType:
+    """
+    Restrict a Query or select() to one page in (created_dt, id) order. With a
+    cursor the page is found by seeking past it instead of skipping rows, so
+    every page costs the same regardless of depth.
+    """
+    query = query.order_by(model.created_dt, model.id)
+    if cursor:
+        created_dt, id = decode_cursor(cursor)
+        query = query.filter(
+            tuple_(model.created_dt, model.id) > tuple_(created_dt, id)
+        )
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit)
 
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
@@ -22,20 +88,69 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         """
         self.model = model
 
-    def get(self, db: Session, id: Any) -> Optional[ModelType]:
-        return db.query(self.model).filter(self.model.id == id).first()
+    def get(
+        self, db: Session, id: Any, *, options: Sequence[ORMOption] = ()
+    ) -> Optional[ModelType]:
+        """
+        Row by id. `options` are loader options such as
+        joinedload(Transaction.bank) for the relationships the caller is
+        going to touch, so they arrive with the row instead of costing a lazy
+        load each.
+        """
+        return (
+            db.query(self.model).options(*options).filter(self.model.id == id).first()
+        )
 
     def get_multi(
-        self, db: Session, *, skip: int = 0, limit: int = 100
+        self,
+        db: Session,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        options: Sequence[ORMOption] = (),
     ) -> List[ModelType]:
-        return db.query(self.model).offset(skip).limit(limit).all()
+        return self.paginate(
+            db.query(self.model).options(*options),
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+        )
 
-    def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
-        obj_in_data = jsonable_encoder(obj_in)
-        db_obj = self.model(**obj_in_data)  # type: ignore
+    def paginate(
+        self,
+        query: Query,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> List[ModelType]:
+        return keyset_page(
+            query, self.model, skip=skip, limit=limit, cursor=cursor
+        ).all()
+
+    def create(
+        self,
+        db: Session,
+        *,
+        obj_in: Union[CreateSchemaType, Dict[str, Any]],
+        commit: bool = True,
+    ) -> ModelType:
+        """
+        Add a new row. With `commit=False` nothing is sent yet, so a caller
+        making several writes can flush them together with one commit.
+        """
+        if isinstance(obj_in, dict):
+            obj_in_data = obj_in
+        else:
+            obj_in_data = obj_in.dict()
+        columns = inspect(self.model).column_attrs.keys()
+        db_obj = self.model(
+            **{field: value for field, value in obj_in_data.items() if field in columns}
+        )  # type: ignore
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        if commit:
+            db.commit()
         return db_obj
 
     def update(
@@ -43,19 +158,20 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db: Session,
         *,
         db_obj: ModelType,
-        obj_in: Union[UpdateSchemaType, Dict[str, Any]]
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+        commit: bool = True,
     ) -> ModelType:
-        obj_data = jsonable_encoder(db_obj)
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
             update_data = obj_in.dict(exclude_unset=True)
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
+        columns = inspect(self.model).column_attrs.keys()
+        for field, value in update_data.items():
+            if field in columns:
+                setattr(db_obj, field, value)
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        if commit:
+            db.commit()
         return db_obj
 
     def remove(self, db: Session, *, id: uuid.UUID) -> ModelType:
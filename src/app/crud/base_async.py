@@ -0,0 +1,111 @@
+from typing import Any, Dict, Generic, List, Optional, Sequence, Type, Union
+
+from sqlalchemy import inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.interfaces import ORMOption
+from sqlalchemy.sql import Select
+import uuid
+
+from app.crud.base import CreateSchemaType, ModelType, UpdateSchemaType, keyset_page
+
+
+class AsyncCRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
+    def __init__(self, model: Type[ModelType]):
+        """
+        Async CRUD object with default methods to create, read, update, delete.
+        Relationships are not lazily loaded on an AsyncSession, so queries
+        must load whatever the caller is going to touch.
+
+        Args:
+            model (Type[ModelType]): A SQLAlchemy model class
+        """
+        self.model = model
+
+    async def get(
+        self, db: AsyncSession, id: Any, *, options: Sequence[ORMOption] = ()
+    ) -> Optional[ModelType]:
+        return await db.get(self.model, id, options=options)
+
+    async def get_multi(
+        self,
+        db: AsyncSession,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        options: Sequence[ORMOption] = (),
+    ) -> List[ModelType]:
+        return await self.paginate(
+            db,
+            select(self.model).options(*options),
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+        )
+
+    async def paginate(
+        self,
+        db: AsyncSession,
+        stmt: Any,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        rows: bool = False,
+    ) -> List[Any]:
+        """
+        One page of `stmt`, as model objects or, with `rows`, as the plain
+        rows of a column projection
+        """
+        stmt = keyset_page(stmt, self.model, skip=skip, limit=limit, cursor=cursor)
+        result = await db.execute(stmt)
+        if rows:
+            return result.all()
+        return result.scalars().all()
+
+    def select(self, columns: Optional[Sequence[str]] = None) -> Select:
+        """
+        select() of whole model objects, or of just `columns` as plain rows.
+        Rows skip building ORM objects entirely, which is much cheaper when
+        they are only going to be serialized.
+        """
+        if columns is None:
+            return select(self.model)
+        return select(*[getattr(self.model, column) for column in columns])
+
+    async def create(
+        self, db: AsyncSession, *, obj_in: Union[CreateSchemaType, Dict[str, Any]]
+    ) -> ModelType:
+        if isinstance(obj_in, dict):
+            obj_in_data = obj_in
+        else:
+            obj_in_data = obj_in.dict(exclude_unset=True)
+        db_obj = self.model(**obj_in_data)  # type: ignore
+        db.add(db_obj)
+        await db.commit()
+        return db_obj
+
+    async def update(
+        self,
+        db: AsyncSession,
+        *,
+        db_obj: ModelType,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+    ) -> ModelType:
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.dict(exclude_unset=True)
+        columns = inspect(self.model).column_attrs.keys()
+        for field, value in update_data.items():
+            if field in columns:
+                setattr(db_obj, field, value)
+        db.add(db_obj)
+        await db.commit()
+        return db_obj
+
+    async def remove(self, db: AsyncSession, *, id: uuid.UUID) -> ModelType:
+        obj = await db.get(self.model, id)
+        await db.delete(obj)
+        await db.commit()
+        return obj
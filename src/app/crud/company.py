@@ -1,20 +1,32 @@
 from typing import Any, Dict, Optional, Union
+import uuid
 
+from sqlalchemy import func, literal_column, select, true
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import ScalarSelect, Subquery
 
 from app.core.security import get_password_hash, verify_password
 from app.crud.base import CRUDBase
+from app.crud.base_async import AsyncCRUDBase
+from app.crud.user import invalidate_principal
+from app.models.bank import Bank
 from app.models.company import Company
 from app.schemas.company import CompanyCreate, CompanyUpdate
+from app.models.transaction import Transaction
 from app.models.user import User
+from app.utils import RankEnum, StatusEnum
 
 
 class CRUDCompany(CRUDBase[Company, CompanyCreate, CompanyUpdate]):
     def get_by_name(self, db: Session, *, name: str) -> Optional[Company]:
         return db.query(Company).filter(Company.name == name).first()
 
-    def create(self, db: Session, *, obj_in: CompanyCreate) -> Company:
-        return super().create(db, obj_in=obj_in)
+    def create(
+        self, db: Session, *, obj_in: CompanyCreate, commit: bool = True
+    ) -> Company:
+        return super().create(db, obj_in=obj_in, commit=commit)
 
     def update(
         self,
@@ -26,18 +38,113 @@ class CRUDCompany(CRUDBase[Company, CompanyCreate, CompanyUpdate]):
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
-            update_data = obj_in.dict(excluse_unset=True)
+            update_data = obj_in.dict(exclude_unset=True)
 
         return super().update(db, db_obj=db_obj, obj_in=update_data)
 
     # Method to return logo
 
-    def add_user(self, db: Session, *, db_obj: Company, user: User):
+    def add_user(
+        self, db: Session, *, db_obj: Company, user: User, commit: bool = True
+    ) -> Company:
         db_obj.members.append(user)
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        invalidate_principal(db, user.id)
+        if commit:
+            db.commit()
         return db_obj
 
 
+class AsyncCRUDCompany(AsyncCRUDBase[Company, CompanyCreate, CompanyUpdate]):
+    async def get_by_name(self, db: AsyncSession, *, name: str) -> Optional[Company]:
+        result = await db.execute(select(Company).filter(Company.name == name))
+        return result.scalars().first()
+
+    async def get_summary(
+        self, db: AsyncSession, *, company_id: uuid.UUID, recent: int
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Everything the dashboard shows for a company, in one statement: the
+        company, its banks with their pending count and sum, the member count
+        per rank and the `recent` latest transactions. Each part is a scalar
+        subquery that Postgres aggregates to JSON, so nothing is lazy loaded
+        and there is a single round trip however many banks there are.
+
+        Returns None when the company doesn't exist.
+        """
+        company_t, bank_t = Company.__table__, Bank.__table__
+        transaction_t, user_t = Transaction.__table__, User.__table__
+
+        company_row = select(company_t).where(company_t.c.id == company_id).subquery()
+        pending = (
+            select(
+                func.count().label("pending_count"),
+                func.coalesce(func.sum(transaction_t.c.amount), 0).label(
+                    "pending_amount"
+                ),
+            )
+            .where(
+                transaction_t.c.bank_id == bank_t.c.id,
+                transaction_t.c.status == StatusEnum.PENDING,
+            )
+            .lateral()
+        )
+        banks = (
+            select(bank_t, pending)
+            .select_from(bank_t.join(pending, true()))
+            .where(bank_t.c.company_id == company_id)
+            .subquery()
+        )
+        ranks = (
+            select(user_t.c.status.label("rank"), func.count().label("members"))
+            .where(user_t.c.company_id == company_id, user_t.c.status.isnot(None))
+            .group_by(user_t.c.status)
+            .subquery()
+        )
+        transactions = (
+            select(transaction_t)
+            .join(bank_t, transaction_t.c.bank_id == bank_t.c.id)
+            .where(bank_t.c.company_id == company_id)
+            .order_by(transaction_t.c.created_dt.desc(), transaction_t.c.id.desc())
+            .limit(recent)
+            .subquery()
+        )
+
+        def json_list(rows: Subquery, *order_by: Any) -> ScalarSelect:
+            return select(
+                func.coalesce(
+                    func.json_agg(aggregate_order_by(rows.table_valued(), *order_by)),
+                    literal_column("'[]'::json"),
+                )
+            ).scalar_subquery()
+
+        statement = select(
+            select(func.row_to_json(company_row.table_valued()))
+            .scalar_subquery()
+            .label("company"),
+            json_list(banks, banks.c.created_dt, banks.c.id).label("banks"),
+            select(func.json_object_agg(ranks.c.rank, ranks.c.members))
+            .scalar_subquery()
+            .label("members"),
+            json_list(
+                transactions,
+                transactions.c.created_dt.desc(),
+                transactions.c.id.desc(),
+            ).label("transactions"),
+        )
+        summary = (await db.execute(statement)).one()
+        if summary.company is None:
+            return None
+        return {
+            "company": summary.company,
+            "banks": summary.banks,
+            "members": {
+                rank.name: (summary.members or {}).get(rank.name, 0)
+                for rank in RankEnum
+            },
+            "transactions": summary.transactions,
+        }
+
+
 company = CRUDCompany(Company)
+company_async = AsyncCRUDCompany(Company)
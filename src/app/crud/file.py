@@ -1,30 +1,76 @@
-from typing import Any, Dict, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from fastapi import UploadFile
+import uuid
 
-from app.core.security import get_password_hash, verify_password
+from app.core import images, storage
 from app.crud.base import CRUDBase
+from app.crud.base_async import AsyncCRUDBase
 from app.models.file import File
 from app.schemas.file import FileCreate, FileUpdate
 from app.models.company import Company
-from app.core.config import settings
 
 
 class CRUDFile(CRUDBase[File, FileCreate, FileUpdate]):
     def create(self, db: Session, *, file: UploadFile, company: Company) -> File:
-        # Save file to local storage
-        compound_name = f"{company.name}_{file.filename}"
-        try:
-            with open(settings.FILE_STORAGE_ROUTE + compound_name) as output:
-                output.write(file.file.read())
-        except Exception as e:
-            return e
-
-        obj_in = File(
-            file_name=file.filename, file_size=len(file.file), company=company
+        # Stream to content-addressed storage; re-uploads reuse the stored bytes
+        content_hash, file_size = storage.store(file.file)
+
+        db_obj = File(
+            file_name=file.filename, file_size=file_size, content_hash=content_hash
+        )
+        db.add(db_obj)
+        company.logo = db_obj
+        db.commit()
+        return db_obj
+
+    def create_variants(
+        self, db: Session, *, original: File, variants: Dict[int, Tuple[str, int]]
+    ) -> List[File]:
+        stem = original.file_name.rsplit(".", 1)[0]
+        db_objs = [
+            File(
+                file_name=f"{stem}-{size}{images.VARIANT_EXTENSION}",
+                file_size=file_size,
+                content_hash=content_hash,
+                original_id=original.id,
+                variant_size=size,
+            )
+            for size, (content_hash, file_size) in sorted(variants.items())
+        ]
+        db.add_all(db_objs)
+        db.commit()
+        return db_objs
+
+
+class AsyncCRUDFile(AsyncCRUDBase[File, FileCreate, FileUpdate]):
+    async def get_logo_of_company(
+        self, db: AsyncSession, *, company_id: uuid.UUID
+    ) -> Optional[File]:
+        result = await db.execute(
+            select(File)
+            .join(Company, Company.logo_id == File.id)
+            .filter(Company.id == company_id)
+        )
+        return result.scalars().first()
+
+    async def get_variant(
+        self, db: AsyncSession, *, original: File, size: int
+    ) -> Optional[File]:
+        """
+        Smallest rendition of `original` that is at least `size` pixels
+        """
+        result = await db.execute(
+            select(File)
+            .filter(File.original_id == original.id, File.variant_size >= size)
+            .order_by(File.variant_size)
+            .limit(1)
         )
-        return super().create(db, obj_in)
+        return result.scalars().first()
 
 
 file = CRUDFile(File)
+file_async = AsyncCRUDFile(File)
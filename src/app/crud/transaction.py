@@ -1,57 +1,145 @@
-from typing import Any, Dict, Optional, Union, List
+from typing import Any, AsyncIterator, Dict, Optional, Sequence, Tuple, Union, List
 
-from sqlalchemy.orm import Session
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm.interfaces import ORMOption
 import uuid
+from datetime import datetime
 
-from app.core.security import get_password_hash, verify_password
 from app.crud.base import CRUDBase
+from app.crud.base_async import AsyncCRUDBase
+from app.crud.bank import bank as bank_crud
 from app.models.transaction import Transaction
-from app.schemas.transaction import TransactionCreate, TransactionUpdate
+from app.schemas.transaction import (
+    TransactionBulkCreate,
+    TransactionCreate,
+    TransactionUpdate,
+)
 from app.models.bank import Bank
 from app.models.company import Company
 from app.models.user import User
 from app.utils import StatusEnum, RankEnum
 
+# Rows per INSERT statement in create_bulk
+BULK_CHUNK_SIZE = 1000
+
 
 class CRUDTransaction(CRUDBase[Transaction, TransactionCreate, TransactionUpdate]):
-    def get_all_by_bank(self, db: Session, *, bank: Bank) -> List[Transaction]:
-        return db.query(Transaction).where(bank_id=bank.id).all()
+    def get_all_by_bank(
+        self, db: Session, *, bank: Bank, options: Sequence[ORMOption] = ()
+    ) -> List[Transaction]:
+        return (
+            db.query(Transaction)
+            .options(*options)
+            .filter(Transaction.bank_id == bank.id)
+            .all()
+        )
 
     def get_multi_by_company(
-        self, db: Session, *, company: Company, skip: int, limit: int
+        self,
+        db: Session,
+        *,
+        company: Company,
+        limit: int,
+        cursor: Optional[str] = None,
+        options: Sequence[ORMOption] = (),
     ) -> List[Transaction]:
-        return (
+        query = (
             db.query(Transaction)
+            .options(*options)
             .join(Transaction.bank)
-            .where(company_id=company.id)
-            .offset(skip)
-            .limit(limit)
-            .all()
+            .filter(Bank.company_id == company.id)
         )
+        return self.paginate(query, limit=limit, cursor=cursor)
 
     def get_all_by_bank_scoped(
-        self, db: Session, *, bank: Bank, scope: StatusEnum
+        self,
+        db: Session,
+        *,
+        bank: Bank,
+        scope: StatusEnum,
+        options: Sequence[ORMOption] = (),
     ) -> List[Transaction]:
-        return db.query(Transaction).where(bank_id=bank.id).where(status=scope).all()
+        return (
+            db.query(Transaction)
+            .options(*options)
+            .filter(Transaction.bank_id == bank.id)
+            .filter(Transaction.status == scope)
+            .all()
+        )
 
     def get_multi_by_company_scoped(
-        self, db: Session, *, company: Company, scope: StatusEnum, skip: int, limit: int
+        self,
+        db: Session,
+        *,
+        company: Company,
+        scope: StatusEnum,
+        limit: int,
+        cursor: Optional[str] = None,
+        options: Sequence[ORMOption] = (),
     ) -> List[Transaction]:
-        return (
+        query = (
             db.query(Transaction)
+            .options(*options)
             .join(Transaction.bank)
-            .where(company_id=company.id)
-            .where(status=scope)
-            .offset(skip)
-            .limit(limit)
-            .all()
+            .filter(Bank.company_id == company.id)
+            .filter(Transaction.status == scope)
         )
+        return self.paginate(query, limit=limit, cursor=cursor)
 
     def create(
-        self, db: Session, *, obj_in: TransactionCreate, creator: User
+        self,
+        db: Session,
+        *,
+        obj_in: TransactionCreate,
+        bank_id: uuid.UUID,
+        creator: User,
     ) -> Transaction:
-        db_item = Bank(**obj_in.dict(), creator_id=creator.id)
-        return super().create(db, obj_in=db_item)
+        """
+        New transactions are always pending, whatever status was sent; only
+        approve moves them into the balance.
+        """
+        db_obj = Transaction(
+            **{**obj_in.dict(), "status": StatusEnum.PENDING},
+            bank_id=bank_id,
+            creator_id=creator.id,
+        )
+        db.add(db_obj)
+        db.commit()
+        return db_obj
+
+    def create_bulk(
+        self, db: Session, *, obj_in: List[TransactionBulkCreate], creator: User
+    ) -> List[Row]:
+        """
+        Insert every transaction as pending with multi-row INSERT ... RETURNING
+        statements and a single commit. Bank ownership must be checked by the
+        caller.
+        """
+        now = datetime.utcnow()
+        rows = [
+            {
+                **item.dict(),
+                "status": StatusEnum.PENDING,
+                "id": uuid.uuid1(),
+                "creator_id": creator.id,
+                "created_dt": now,
+                "updated_dt": now,
+            }
+            for item in obj_in
+        ]
+        created = []
+        for start in range(0, len(rows), BULK_CHUNK_SIZE):
+            stmt = (
+                insert(Transaction)
+                .values(rows[start : start + BULK_CHUNK_SIZE])
+                .returning(*Transaction.__table__.columns)
+            )
+            created.extend(db.execute(stmt).all())
+        db.commit()
+        return created
 
     def update(
         self,
@@ -67,16 +155,191 @@ class CRUDTransaction(CRUDBase[Transaction, TransactionCreate, TransactionUpdate
             update_data = obj_in
         else:
             update_data = obj_in.dict(exclude_unset=True)
-        return super().update(db, db_obj=db_obj, obj_in=update_data)
+        balance_changed = (
+            db_obj.status is StatusEnum.APPROVED
+            and update_data.get("amount") is not None
+        )
+        if balance_changed:
+            bank_crud.add_to_balance(
+                db, bank_id=db_obj.bank_id, amount=update_data["amount"] - db_obj.amount
+            )
+        db_obj = super().update(db, db_obj=db_obj, obj_in=update_data)
+        if balance_changed:
+            bank_crud.invalidate_history(
+                bank_id=db_obj.bank_id, created_dt=db_obj.created_dt
+            )
+        return db_obj
 
     def approve(
-        self, db: Session, *, db_obj: Transaction, approver: User
-    ) -> Transaction:
-        return super().update(
-            db,
-            db_obj=db_obj,
-            obj_in={"status": StatusEnum.APPROVED, "approver_id": approver.id},
+        self,
+        db: Session,
+        *,
+        ids: List[uuid.UUID],
+        company_id: uuid.UUID,
+        approver: User,
+    ) -> Tuple[List[Row], List[uuid.UUID], List[uuid.UUID]]:
+        """
+        Approve the pending transactions among `ids` that belong to the
+        company, in one statement: a conditional UPDATE ... RETURNING that
+        only matches rows still PENDING, and an UPDATE adding their amounts
+        to the bank balances.
+
+        Concurrent approvals of the same row can't both succeed; the second
+        waits on the row lock and then no longer matches the WHERE clause.
+        The banks involved are locked first, in id order, so approvals that
+        share banks queue up instead of deadlocking on the balance UPDATE.
+
+        Returns the approved rows, the ids that exist in the company but were
+        not pending, and the ids that don't exist in the company.
+        """
+        # Built on the tables: SQLAlchemy 1.4.23 drops CTEs added with
+        # add_cte() from ORM enabled statements
+        transactions, banks = Transaction.__table__, Bank.__table__
+        # A separate statement, not a CTE: Postgres doesn't order the CTEs of
+        # one statement, so the UPDATEs could take bank locks before it ran
+        lock = (
+            select(banks.c.id)
+            .where(
+                banks.c.id.in_(
+                    select(transactions.c.bank_id).where(transactions.c.id.in_(ids))
+                )
+            )
+            .where(banks.c.company_id == company_id)
+            .order_by(banks.c.id)
+            .with_for_update()
+        )
+        db.execute(lock)
+        approved = (
+            update(transactions)
+            .where(transactions.c.id.in_(ids))
+            .where(transactions.c.status == StatusEnum.PENDING)
+            .where(transactions.c.bank_id == banks.c.id)
+            .where(banks.c.company_id == company_id)
+            .values(
+                status=StatusEnum.APPROVED,
+                approver_id=approver.id,
+                updated_dt=datetime.utcnow(),
+            )
+            .returning(*transactions.c)
+            .cte("approved")
+        )
+        totals = (
+            select(approved.c.bank_id, func.sum(approved.c.amount).label("amount"))
+            .group_by(approved.c.bank_id)
+            .subquery()
+        )
+        balances = (
+            update(banks)
+            .where(banks.c.id == totals.c.bank_id)
+            .values(balance=banks.c.balance + totals.c.amount)
+            .cte("balances")
+        )
+        # The outer SELECT sees the table as it was before the CTEs ran, so it
+        # finds every requested row in scope whether or not it was approved
+        stmt = (
+            select(transactions.c.id.label("requested_id"), *approved.c)
+            .select_from(
+                transactions.join(
+                    banks, transactions.c.bank_id == banks.c.id
+                ).outerjoin(approved, approved.c.id == transactions.c.id)
+            )
+            .where(transactions.c.id.in_(ids))
+            .where(banks.c.company_id == company_id)
+            .add_cte(balances)
+        )
+        rows = db.execute(stmt).all()
+        db.commit()
+
+        approved_rows = [row for row in rows if row.id is not None]
+        for row in approved_rows:
+            bank_crud.invalidate_history(bank_id=row.bank_id, created_dt=row.created_dt)
+        not_pending = [row.requested_id for row in rows if row.id is None]
+        found = {row.requested_id for row in rows}
+        not_found = [id for id in ids if id not in found]
+        return approved_rows, not_pending, not_found
+
+    def remove(self, db: Session, *, id: uuid.UUID) -> Transaction:
+        obj = db.query(Transaction).get(id)
+        if obj.status is StatusEnum.APPROVED:
+            bank_crud.add_to_balance(db, bank_id=obj.bank_id, amount=-obj.amount)
+        db.delete(obj)
+        db.commit()
+        if obj.status is StatusEnum.APPROVED:
+            bank_crud.invalidate_history(bank_id=obj.bank_id, created_dt=obj.created_dt)
+        return obj
+
+
+class AsyncCRUDTransaction(
+    AsyncCRUDBase[Transaction, TransactionCreate, TransactionUpdate]
+):
+    async def get_with_bank(
+        self, db: AsyncSession, *, id: uuid.UUID
+    ) -> Optional[Transaction]:
+        return await self.get(db, id, options=[joinedload(Transaction.bank)])
+
+    async def get_all_by_bank_scoped(
+        self,
+        db: AsyncSession,
+        *,
+        bank_id: uuid.UUID,
+        scope: StatusEnum,
+        columns: Optional[Sequence[str]] = None,
+    ) -> List[Any]:
+        result = await db.execute(
+            self.select(columns)
+            .filter(Transaction.bank_id == bank_id)
+            .filter(Transaction.status == scope)
+        )
+        if columns is not None:
+            return result.all()
+        return result.scalars().all()
+
+    async def get_multi_by_company_scoped(
+        self,
+        db: AsyncSession,
+        *,
+        company_id: uuid.UUID,
+        scope: StatusEnum,
+        limit: int,
+        cursor: Optional[str] = None,
+        columns: Optional[Sequence[str]] = None,
+    ) -> List[Any]:
+        stmt = (
+            self.select(columns)
+            .join(Transaction.bank)
+            .filter(Bank.company_id == company_id)
+            .filter(Transaction.status == scope)
+        )
+        return await self.paginate(
+            db, stmt, limit=limit, cursor=cursor, rows=columns is not None
+        )
+
+    async def stream_by_company(
+        self,
+        db: AsyncSession,
+        *,
+        company_id: uuid.UUID,
+        columns: List[str],
+        scope: Optional[StatusEnum] = None,
+        chunk_rows: int = 1000,
+    ) -> AsyncIterator[Row]:
+        """
+        Yield `columns` of every company transaction as plain rows, read in
+        chunks from a server-side cursor so memory stays flat.
+        """
+        stmt = (
+            self.select(columns)
+            .join(Transaction.bank)
+            .filter(Bank.company_id == company_id)
+            .order_by(Transaction.created_dt, Transaction.id)
         )
+        if scope is not None:
+            stmt = stmt.filter(Transaction.status == scope)
+        result = await db.stream(stmt)
+        async for partition in result.partitions(chunk_rows):
+            for row in partition:
+                yield row
 
 
 transaction = CRUDTransaction(Transaction)
+transaction_async = AsyncCRUDTransaction(Transaction)
@@ -1,18 +1,56 @@
-from typing import Any, Dict, Optional, Union
+from typing import Any, Dict, Optional, Sequence, Union
 
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.interfaces import ORMOption
+import uuid
 
-from app.core.security import get_password_hash, verify_password
+from app.core.cache import principal_cache
+from app.core.security import (
+    ensure_password_capacity,
+    get_password_hash,
+    verify_password,
+    verify_password_async,
+)
 from app.crud.base import CRUDBase
+from app.crud.base_async import AsyncCRUDBase
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
 from app.schemas.company import Company
 from app.utils import RankEnum
 
+_STALE_PRINCIPALS = "stale_principals"
+
+
+def invalidate_principal(db: Session, user_id: uuid.UUID) -> None:
+    """
+    Drop the cached principal of `user_id` once the session's transaction
+    commits. Call it before the commit. Dropping the principal any earlier
+    would let a concurrent request cache the old row again in between.
+    """
+    db.info.setdefault(_STALE_PRINCIPALS, set()).add(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _drop_stale_principals(session: Session) -> None:
+    for user_id in session.info.pop(_STALE_PRINCIPALS, ()):
+        principal_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_stale_principals(session: Session, previous_transaction: Any) -> None:
+    if not session.in_transaction():
+        session.info.pop(_STALE_PRINCIPALS, None)
+
 
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
-    def get_by_username(self, db: Session, *, username: str) -> Optional[User]:
-        return db.query(User).filter(User.username == username).first()
+    def get_by_username(
+        self, db: Session, *, username: str, options: Sequence[ORMOption] = ()
+    ) -> Optional[User]:
+        return (
+            db.query(User).options(*options).filter(User.username == username).first()
+        )
 
     def get_by_discord_id(self, db: Session, *, discord_id: str) -> Optional[User]:
         return db.query(User).filter(User.discord_id == discord_id).first()
@@ -26,7 +64,6 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         )
         db.add(db_obj)
         db.commit()
-        db.refresh(db_obj)
         return db_obj
 
     def update(
@@ -40,15 +77,22 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             hashed_password = get_password_hash(update_data["password"])
             del update_data["password"]
             update_data["hashed_password"] = hashed_password
+        invalidate_principal(db, db_obj.id)
         return super().update(db, db_obj=db_obj, obj_in=update_data)
 
-    def update_rank(self, db: Session, *, db_obj: User, rank: RankEnum) -> User:
-        user = super().get(db=db, id=db_obj.id)
-        user.rank = rank
-        db.add(user)
-        db.commit()
-        db.refresh(user)
-        return user
+    def update_rank(
+        self, db: Session, *, db_obj: User, rank: RankEnum, commit: bool = True
+    ) -> User:
+        db_obj.rank = rank
+        db.add(db_obj)
+        invalidate_principal(db, db_obj.id)
+        if commit:
+            db.commit()
+        return db_obj
+
+    def remove(self, db: Session, *, id: uuid.UUID) -> User:
+        invalidate_principal(db, id)
+        return super().remove(db, id=id)
 
     def authenticate(
         self, db: Session, *, username: str, password: str
@@ -70,4 +114,33 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         return user.company
 
 
+class AsyncCRUDUser(AsyncCRUDBase[User, UserCreate, UserUpdate]):
+    async def get_by_username(
+        self, db: AsyncSession, *, username: str
+    ) -> Optional[User]:
+        result = await db.execute(select(User).filter(User.username == username))
+        return result.scalars().first()
+
+    async def get_by_discord_id(
+        self, db: AsyncSession, *, discord_id: str
+    ) -> Optional[User]:
+        result = await db.execute(select(User).filter(User.discord_id == discord_id))
+        return result.scalars().first()
+
+    async def authenticate(
+        self, db: AsyncSession, *, username: str, password: str
+    ) -> Optional[User]:
+        ensure_password_capacity()
+        user = await self.get_by_username(db, username=username)
+        if not user:
+            return None
+        # Hand the connection back to the pool while bcrypt runs, a login
+        # burst would otherwise drain it for every other endpoint.
+        await db.close()
+        if not await verify_password_async(password, user.hashed_password):
+            return None
+        return user
+
+
 user = CRUDUser(User)
+user_async = AsyncCRUDUser(User)
@@ -1,7 +1,57 @@
+from typing import Any, Dict
+
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
+from app.core import metrics
 from app.core.config import settings
 
-engine = create_engine(settings.SQLMODEL_DATABASE_URI, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def engine_options(*, is_async: bool) -> Dict[str, Any]:
+    """
+    create_engine() pool and connection arguments from the settings
+    """
+    # Only the psycopg2 engine goes through PgBouncer: SQLAlchemy's asyncpg
+    # dialect prepares named statements even with its caches off, so the
+    # async engine keeps its pool and connects to Postgres directly
+    if settings.DB_PGBOUNCER and not is_async:
+        return {"poolclass": metrics.InstrumentedNullPool}
+
+    options: Dict[str, Any] = {
+        "poolclass": metrics.InstrumentedAsyncAdaptedQueuePool
+        if is_async
+        else metrics.InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if settings.DB_STATEMENT_TIMEOUT:
+        timeout = str(settings.DB_STATEMENT_TIMEOUT)
+        options["connect_args"] = (
+            {"server_settings": {"statement_timeout": timeout}}
+            if is_async
+            else {"options": f"-c statement_timeout={timeout}"}
+        )
+    return options
+
+
+engine = create_engine(settings.SQLMODEL_DATABASE_URI, **engine_options(is_async=False))
+metrics.instrument_engine(engine, "sync")
+# Objects stay usable after commit without a SELECT to reload them; what a
+# write sends is already what is stored, and server defaults come back through
+# RETURNING (see Base.__mapper_args__)
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, bind=engine, expire_on_commit=False
+)
+
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URI, **engine_options(is_async=True)
+)
+metrics.instrument_engine(async_engine.sync_engine, "async")
+# Objects stay usable after commit; async sessions can't lazily refresh them
+AsyncSessionLocal = sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
@@ -0,0 +1,344 @@
+"""
+Generate a large synthetic dataset for benchmarks and capacity planning.
+
+Companies get a skewed number of members (one GOVERNOR each, then CONSUL,
+OFFICER and SETTLER ranks) and banks; transactions are spread unevenly over
+the banks with long tailed amounts and a mix of approved and pending. Rows
+are bulk loaded with COPY, the transactions in parallel chunks, and the same
+--seed, --chunk-size and --epoch always produce the same rows regardless of
+the number of workers. Dates count back from --epoch, the current time unless
+given.
+
+    python -m app.generate_data --companies 10000 --transactions 10000000
+"""
+from bisect import bisect
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from itertools import accumulate
+from typing import Callable, Iterable, List, Optional, Sequence
+import argparse
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import random
+import time
+import uuid
+
+from sqlalchemy import text
+
+from app.core.security import pwd_context
+from app.db.session import engine
+from app.utils import RankEnum, StatusEnum
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Share of members holding each rank, after the company's one GOVERNOR
+RANK_WEIGHTS = {RankEnum.CONSUL: 5, RankEnum.OFFICER: 20, RankEnum.SETTLER: 75}
+PENDING_SHARE = 0.12
+WITHDRAWAL_SHARE = 0.35
+# Most transactions are small and a few are very large
+AMOUNT_MU = 4.0
+AMOUNT_SIGMA = 1.5
+
+TRANSACTION_COLUMNS = (
+    "id",
+    "amount",
+    "status",
+    "bank_id",
+    "creator_id",
+    "approver_id",
+    "created_dt",
+    "updated_dt",
+)
+
+
+def derived_id(seed: int, kind: str, index: int) -> str:
+    """
+    Stable id of the index-th generated row of `kind`, so that any worker
+    can reference rows it didn't generate
+    """
+    digest = hashlib.md5(f"{seed}:{kind}:{index}".encode()).digest()
+    return str(uuid.UUID(bytes=digest, version=4))
+
+
+class Layout:
+    """
+    How many members and banks every company has, and how the transactions
+    are weighted over the banks. Small enough to ship to every worker.
+    """
+
+    def __init__(
+        self, *, seed: int, companies: int, members: float, banks: float
+    ) -> None:
+        rng = random.Random(f"{seed}:layout")
+        self.seed = seed
+        self.members = [
+            max(1, round(rng.expovariate(1 / members))) for _ in range(companies)
+        ]
+        self.banks = [
+            max(1, round(rng.expovariate(1 / banks))) for _ in range(companies)
+        ]
+        # Index of each company's first member, its GOVERNOR
+        self.member_offsets = [0, *accumulate(self.members)][:-1]
+        self.bank_companies = [
+            company for company, count in enumerate(self.banks) for _ in range(count)
+        ]
+        self.bank_weights = list(
+            accumulate(rng.paretovariate(1.2) for _ in self.bank_companies)
+        )
+
+
+def copy_rows(table: str, columns: Sequence[str], rows: Iterable[str]) -> None:
+    """
+    COPY tab separated `rows` (text format, one per line) into `table`
+    """
+    buffer = io.StringIO()
+    buffer.writelines(rows)
+    buffer.seek(0)
+    connection = engine.raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY "{table}" ({", ".join(columns)}) FROM STDIN', buffer
+            )
+        connection.commit()
+    finally:
+        connection.close()
+
+
+_layout: Optional[Layout] = None
+_user_ids: List[str] = []
+_bank_ids: List[str] = []
+
+
+def _init_worker(layout: Layout) -> None:
+    global _layout, _user_ids, _bank_ids
+    _layout = layout
+    _user_ids = [derived_id(layout.seed, "user", i) for i in range(sum(layout.members))]
+    _bank_ids = [
+        derived_id(layout.seed, "bank", i) for i in range(len(layout.bank_companies))
+    ]
+
+
+def load_transactions(chunk: int, count: int, start: datetime, days: int) -> int:
+    """
+    Generate and COPY the chunk-th batch of `count` transactions
+    """
+    layout = _layout
+    rng = random.Random(f"{layout.seed}:transaction:{chunk}")
+    weights = layout.bank_weights
+    total_weight = weights[-1]
+    span = days * 86400
+    rows = []
+    for _ in range(count):
+        bank = bisect(weights, rng.random() * total_weight)
+        company = layout.bank_companies[bank]
+        governor = layout.member_offsets[company]
+        creator = governor + rng.randrange(layout.members[company])
+        amount = round(rng.lognormvariate(AMOUNT_MU, AMOUNT_SIGMA), 2)
+        if rng.random() < WITHDRAWAL_SHARE:
+            amount = -amount
+        if rng.random() < PENDING_SHARE:
+            status, approver = StatusEnum.PENDING.value, "\\N"
+        else:
+            status, approver = StatusEnum.APPROVED.value, _user_ids[governor]
+        # Skewed towards recent activity
+        created_dt = start - timedelta(seconds=span * rng.random() ** 2)
+        rows.append(
+            f"{uuid.UUID(int=rng.getrandbits(128), version=4)}\t{amount}\t{status}\t"
+            f"{_bank_ids[bank]}\t{_user_ids[creator]}\t{approver}\t"
+            f"{created_dt}\t{created_dt}\n"
+        )
+    copy_rows("transaction", TRANSACTION_COLUMNS, rows)
+    return count
+
+
+def load_owners(layout: Layout, *, password: str, start: datetime) -> None:
+    """
+    COPY the companies, their members and their banks
+    """
+    seed = layout.seed
+    company_ids = [derived_id(seed, "company", i) for i in range(len(layout.members))]
+    copy_rows(
+        "company",
+        ("id", "name", "created_dt", "updated_dt"),
+        (
+            f"{id}\tCompany {seed}-{i}\t{start}\t{start}\n"
+            for i, id in enumerate(company_ids)
+        ),
+    )
+
+    # Hashed once, every generated member shares the password
+    hashed_password = pwd_context.hash(password)
+    rng = random.Random(f"{seed}:users")
+    ranks, weights = zip(*RANK_WEIGHTS.items())
+
+    def users() -> Iterable[str]:
+        for company, count in enumerate(layout.members):
+            for member in range(count):
+                index = layout.member_offsets[company] + member
+                rank = (
+                    RankEnum.GOVERNOR if member == 0 else rng.choices(ranks, weights)[0]
+                )
+                yield (
+                    f"{derived_id(seed, 'user', index)}\tgen-{seed}-{index}\t"
+                    f"Player {index}\t{hashed_password}\tt\tf\t"
+                    f"{company_ids[company]}\t{rank.name}\t{start}\t{start}\n"
+                )
+
+    copy_rows(
+        "user",
+        (
+            "id",
+            "username",
+            "in_game_name",
+            "hashed_password",
+            "is_active",
+            "is_superuser",
+            "company_id",
+            "status",
+            "created_dt",
+            "updated_dt",
+        ),
+        users(),
+    )
+    copy_rows(
+        "bank",
+        ("id", "name", "status", "company_id", "balance", "created_dt", "updated_dt"),
+        (
+            f"{derived_id(seed, 'bank', i)}\tBank {i}\t{StatusEnum.ACTIVE.value}\t"
+            f"{company_ids[company]}\t0\t{start}\t{start}\n"
+            for i, company in enumerate(layout.bank_companies)
+        ),
+    )
+
+
+def update_balances(layout: Layout) -> None:
+    company_ids = [
+        derived_id(layout.seed, "company", i) for i in range(len(layout.members))
+    ]
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                """
+                UPDATE bank SET balance = totals.amount
+                FROM (
+                    SELECT transaction.bank_id, sum(transaction.amount) AS amount
+                    FROM transaction JOIN bank ON transaction.bank_id = bank.id
+                    WHERE bank.company_id = ANY(CAST(:company_ids AS uuid[]))
+                      AND transaction.status = 'APPROVED'
+                    GROUP BY transaction.bank_id
+                ) AS totals
+                WHERE bank.id = totals.bank_id
+                """
+            ),
+            {"company_ids": company_ids},
+        )
+        connection.execute(text('ANALYZE company, bank, "user", transaction'))
+
+
+def timed(label: str, fn: Callable[[], None]) -> None:
+    began = time.perf_counter()
+    fn()
+    logger.info("%s in %.1fs", label, time.perf_counter() - began)
+
+
+def generate(
+    *,
+    seed: int,
+    companies: int,
+    members: float,
+    banks: float,
+    transactions: int,
+    days: int,
+    password: str,
+    workers: int,
+    chunk_size: int,
+    epoch: Optional[datetime] = None,
+) -> None:
+    layout = Layout(seed=seed, companies=companies, members=members, banks=banks)
+    start = (epoch or datetime.utcnow()).replace(microsecond=0)
+    timed(
+        f"Loaded {companies} companies, {sum(layout.members)} users and "
+        f"{len(layout.bank_companies)} banks",
+        lambda: load_owners(layout, password=password, start=start),
+    )
+
+    def load_all_transactions() -> None:
+        chunks = [
+            (chunk, min(chunk_size, transactions - offset))
+            for chunk, offset in enumerate(range(0, transactions, chunk_size))
+        ]
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(layout,),
+        ) as executor:
+            futures = [
+                executor.submit(load_transactions, chunk, count, start, days)
+                for chunk, count in chunks
+            ]
+            loaded = 0
+            for future in futures:
+                loaded += future.result()
+                logger.info("%s/%s transactions", loaded, transactions)
+
+    timed(f"Loaded {transactions} transactions", load_all_transactions)
+    timed("Updated bank balances", lambda: update_balances(layout))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Bulk load a synthetic dataset with COPY"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--companies", type=int, default=1000)
+    parser.add_argument(
+        "--members", type=float, default=20, help="average members per company"
+    )
+    parser.add_argument(
+        "--banks", type=float, default=3, help="average banks per company"
+    )
+    parser.add_argument("--transactions", type=int, default=1_000_000)
+    parser.add_argument(
+        "--days", type=int, default=365, help="history the transactions span"
+    )
+    parser.add_argument(
+        "--password", default="generated", help="password of every generated user"
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=100_000,
+        help="transactions per COPY, part of what --seed reproduces",
+    )
+    parser.add_argument(
+        "--epoch",
+        type=datetime.fromisoformat,
+        help="UTC time the dates count back from, now unless given",
+    )
+    args = parser.parse_args()
+
+    logger.info("Generating data with seed %s", args.seed)
+    generate(
+        seed=args.seed,
+        companies=args.companies,
+        members=args.members,
+        banks=args.banks,
+        transactions=args.transactions,
+        days=args.days,
+        password=args.password,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        epoch=args.epoch,
+    )
+    logger.info("Data generated")
+
+
+if __name__ == "__main__":
+    main()
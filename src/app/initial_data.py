@@ -1,18 +1,32 @@
 import logging
 
+from sqlalchemy import func, select
+
 from app.db.session import SessionLocal
 from app.db.init_db import init_db
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Key of the advisory lock serializing initial data creation across processes
+INIT_LOCK_KEY = 0x656C635F696E6974
+
 
 def init() -> None:
-    db = SessionLocal()
-    init_db(db)
+    with SessionLocal() as db:
+        # Every worker runs this as it starts. The lock makes the others wait
+        # for the first one to create the data, after which they find it; it
+        # is released when the transaction ends.
+        db.execute(select(func.pg_advisory_xact_lock(INIT_LOCK_KEY)))
+        init_db(db)
+        db.commit()
 
 
 def main() -> None:
     logger.info("Creating initial data")
     init()
     logger.info("Initial data created")
+
+
+if __name__ == "__main__":
+    main()
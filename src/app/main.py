@@ -1,8 +1,12 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
 
 from app.api.api_v1.api import api_router
+from app.core import metrics
 from app.core.config import settings
+from app.core.security import PasswordHasherBusy
 from app.initial_data import main as init_db
 
 
@@ -20,12 +24,33 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_headers=["*"],
     )
 
+# Reads the matched route from the scope once the request has been served
+app.add_middleware(metrics.MetricsMiddleware)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 
-init_db()
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Too many password checks in progress, retry shortly."},
+        headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER)},
+    )
+
+
+@app.on_event("startup")
+async def create_initial_data() -> None:
+    # At startup rather than import, so that importing the app (tests, tools,
+    # gunicorn --preload) needs no database
+    await run_in_threadpool(init_db)
 
 
 @app.get("/")
 def ping():
     return {"msg": "pong!"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def read_metrics():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
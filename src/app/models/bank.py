@@ -1,9 +1,8 @@
 from typing import TYPE_CHECKING
 
-from sqlalchemy import Column, String, ForeignKey, select, func, Enum
+from sqlalchemy import Column, String, ForeignKey, Float, Enum
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import column_property, relationship
-from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import relationship
 
 from .base import Base
 from app.utils import StatusEnum
@@ -16,13 +15,11 @@ if TYPE_CHECKING:
 class Bank(Base):
     name = Column(String(64), nullable=False)
     status = Column("status", Enum(StatusEnum))
-    company_id = Column(UUID(as_uuid=True), ForeignKey("company.id"))
+    company_id = Column(UUID(as_uuid=True), ForeignKey("company.id"), index=True)
+    # Running sum of approved transactions, maintained by crud.transaction
+    balance = Column(Float, nullable=False, default=0.0, server_default="0")
 
     company = relationship("Company", back_populates="banks")
     transactions = relationship(
         "Transaction", back_populates="bank", cascade="all, delete"
     )
-
-    @hybrid_property
-    def balance(self):
-        return sum(t.amount for t in self.transactions)
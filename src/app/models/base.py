@@ -9,6 +9,10 @@ from datetime import datetime
 
 @as_declarative()
 class Base:
+    # Fetch server generated values in the INSERT/UPDATE itself (RETURNING)
+    # rather than with a SELECT when they are next read
+    __mapper_args__ = {"eager_defaults": True}
+
     @declared_attr
     def __tablename__(cls) -> str:
         return cls.__name__.lower()
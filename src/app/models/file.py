@@ -1,6 +1,7 @@
 from typing import TYPE_CHECKING
 
-from sqlalchemy import Column, String, Integer
+from sqlalchemy import BigInteger, Column, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
 from .base import Base
@@ -10,7 +11,18 @@ if TYPE_CHECKING:
 
 
 class File(Base):
+    __table_args__ = (UniqueConstraint("original_id", "variant_size"),)
+
     file_name = Column(String(256), nullable=False)
-    file_size = Column(Integer, nullable=False)
+    file_size = Column(BigInteger, nullable=False)
+    # sha256 of the content, which is also its storage key
+    content_hash = Column(String(64), index=True)
+    # Resized renditions point at the upload they were made from
+    original_id = Column(UUID(as_uuid=True), ForeignKey("file.id", ondelete="CASCADE"))
+    variant_size = Column(Integer)
 
     company = relationship("Company", back_populates="logo")
+    original = relationship("File", back_populates="variants", remote_side="File.id")
+    variants = relationship(
+        "File", back_populates="original", cascade="all, delete-orphan"
+    )
@@ -1,6 +1,6 @@
 from typing import TYPE_CHECKING
 
-from sqlalchemy import Column, Float, ForeignKey, Enum
+from sqlalchemy import Column, Float, ForeignKey, Enum, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 
@@ -27,3 +27,21 @@ class Transaction(Base):
     approver = relationship(
         "User", back_populates="approved_transactions", foreign_keys=[approver_id]
     )
+
+    __table_args__ = (
+        # Per bank/status lookups, in keyset pagination order
+        Index(
+            "ix_transaction_bank_id_status_created_dt",
+            "bank_id",
+            "status",
+            "created_dt",
+            "id",
+        ),
+        # The approval queue is small compared to the ledger
+        Index(
+            "ix_transaction_pending_bank_id",
+            "bank_id",
+            "created_dt",
+            postgresql_where=text("status = 'PENDING'"),
+        ),
+    )
@@ -1,6 +1,6 @@
 from typing import TYPE_CHECKING
 
-from sqlalchemy import Column, String, ForeignKey, Boolean, Enum
+from sqlalchemy import Column, String, ForeignKey, Boolean, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 
@@ -15,16 +15,24 @@ if TYPE_CHECKING:
 
 
 class User(Base):
-    username = Column(String(64), nullable=False)
+    username = Column(String(64), nullable=False, index=True)
     in_game_name = Column(String(64), nullable=False)
     discord_name = Column(String(64))
     discord_id = Column(String(128))
     is_active = Column(Boolean(), default=True)
     is_superuser = Column(Boolean(), default=False)
-    company_id = Column(UUID(as_uuid=True), ForeignKey("company.id"))
+    company_id = Column(UUID(as_uuid=True), ForeignKey("company.id"), index=True)
     rank = Column("status", Enum(RankEnum))
     hashed_password = Column(String(256))
 
+    __table_args__ = (
+        Index(
+            "ix_user_discord_id", discord_id, postgresql_where=discord_id.isnot(None)
+        ),
+        # Keyset pagination order
+        Index("ix_user_created_dt_id", "created_dt", "id"),
+    )
+
     company = relationship("Company", back_populates="members")
     transactions = relationship(
         "Transaction",
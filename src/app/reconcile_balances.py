@@ -0,0 +1,53 @@
+import argparse
+import logging
+
+from app import crud
+from app.db.session import SessionLocal
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def reconcile(*, batch_size: int, repair: bool) -> int:
+    db = SessionLocal()
+    drifted = 0
+    after_id = None
+    try:
+        while True:
+            drift, after_id = crud.bank.reconcile_balances(
+                db, after_id=after_id, limit=batch_size, repair=repair
+            )
+            for id, stored, actual in drift:
+                logger.warning(
+                    "Bank %s balance drift: stored %s, actual %s", id, stored, actual
+                )
+            drifted += len(drift)
+            if after_id is None:
+                break
+    finally:
+        db.close()
+    return drifted
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Recompute bank balances from approved transactions"
+    )
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument(
+        "--repair", action="store_true", help="Overwrite drifted balances"
+    )
+    args = parser.parse_args()
+
+    logger.info("Reconciling bank balances")
+    drifted = reconcile(batch_size=args.batch_size, repair=args.repair)
+    if drifted and args.repair:
+        logger.info("Repaired %s bank balances", drifted)
+    elif drifted:
+        logger.info("%s bank balances drifted, rerun with --repair to fix", drifted)
+    else:
+        logger.info("All bank balances match")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,23 @@
-from .bank import Bank, BankCreate, BankInDB, BankUpdate
-from .company import Company, CompanyCreate, CompanyInDB, CompanyUpdate
+from .bank import Bank, BankCreate, BankHistoryPoint, BankInDB, BankUpdate
+from .company import (
+    BankSummary,
+    Company,
+    CompanyCreate,
+    CompanyInDB,
+    CompanySummary,
+    CompanyUpdate,
+)
 from .file import File, FileCreate, FileInDB, FileUpdate
 from .msg import Msg
 from .token import Token, TokenPayload
 from .transaction import (
     Transaction,
+    TransactionApprove,
+    TransactionApproveResult,
+    TransactionBulkCreate,
     TransactionCreate,
     TransactionInDB,
+    TransactionPage,
     TransactionUpdate,
 )
-from .user import User, UserCreate, UserInDB, UserUpdate
+from .user import Principal, User, UserCreate, UserInDB, UserPage, UserUpdate
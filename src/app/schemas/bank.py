@@ -45,3 +45,10 @@ class Bank(BankInDBBase):
 # Additional properties stored in db
 class BankInDB(BankInDBBase):
     pass
+
+
+# Approved amounts within one bucket of time and the balance at its end
+class BankHistoryPoint(SQLModel):
+    start: datetime
+    net: float
+    balance: float
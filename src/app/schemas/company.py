@@ -1,9 +1,12 @@
-from typing import Optional
+from typing import Dict, List, Optional
 
 from sqlmodel import SQLModel, Field
 from datetime import datetime
 import uuid
 
+from app.schemas.bank import Bank
+from app.schemas.transaction import Transaction
+
 # Shared Properties
 class CompanyBase(SQLModel):
     name: str
@@ -39,3 +42,17 @@ class Company(CompanyInDBBase):
 # Additional properties stored in db
 class CompanyInDB(CompanyInDBBase):
     pass
+
+
+# Bank with the count and sum of its pending transactions
+class BankSummary(Bank):
+    pending_count: int
+    pending_amount: float
+
+
+# Everything the company dashboard shows, members counted per rank
+class CompanySummary(SQLModel):
+    company: Company
+    banks: List[BankSummary]
+    members: Dict[str, int]
+    transactions: List[Transaction]
@@ -7,7 +7,8 @@ from datetime import datetime
 # Shared Properties
 class FileBase(SQLModel):
     file_name: str
-    file_size: str
+    file_size: int
+    content_hash: Optional[str] = Field(default=None)
 
 
 # Properties to recieve via API on creation
@@ -23,6 +24,8 @@ class FileUpdate(FileBase):
 # Properties shared by models stored in db
 class FileInDBBase(FileBase):
     id: uuid.UUID
+    original_id: Optional[uuid.UUID] = Field(default=None)
+    variant_size: Optional[int] = Field(default=None)
     updated_dt: datetime
     created_dt: datetime
 
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 
 from sqlmodel import SQLModel, Field
 from datetime import datetime
@@ -17,6 +17,12 @@ class TransactionCreate(TransactionBase):
     status: Optional[StatusEnum] = Field(default=StatusEnum.PENDING)
 
 
+# Properties to recieve via API on bulk creation, always created pending
+class TransactionBulkCreate(SQLModel):
+    amount: float
+    bank_id: uuid.UUID
+
+
 # Properties to recieve via API on update
 class TransactionUpdate(TransactionBase):
     amount: Optional[float] = Field(default=None)
@@ -42,6 +48,26 @@ class Transaction(TransactionInDBBase):
     pass
 
 
+# Page of results with a keyset cursor for the next one
+class TransactionPage(SQLModel):
+    items: List[Transaction]
+    next_cursor: Optional[str] = Field(default=None)
+
+
+# Ids to approve in one request
+class TransactionApprove(SQLModel):
+    ids: List[uuid.UUID]
+
+
+# Outcome of a bulk approval
+class TransactionApproveResult(SQLModel):
+    approved: List[Transaction]
+    # In the company but no longer pending
+    not_pending: List[uuid.UUID]
+    # Not a transaction of the user's company
+    not_found: List[uuid.UUID]
+
+
 # Additional properties stored in db
 class TransactionInDB(TransactionInDBBase):
     pass
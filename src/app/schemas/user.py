@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 
 from sqlmodel import SQLModel, Field
 from datetime import datetime
@@ -42,6 +42,24 @@ class User(UserInDBBase):
     pass
 
 
+# Page of results with a keyset cursor for the next one
+class UserPage(SQLModel):
+    items: List[User]
+    next_cursor: Optional[str] = Field(default=None)
+
+
 # Additional properties stored in db
 class UserInDB(UserInDBBase):
     hashed_password: str
+
+
+# Identity of an authenticated user, small enough to cache between requests
+class Principal(SQLModel):
+    id: uuid.UUID
+    company_id: Optional[uuid.UUID] = Field(default=None)
+    rank: Optional[RankEnum] = Field(default=None)
+    is_active: Optional[bool] = Field(default=True)
+    is_superuser: Optional[bool] = Field(default=False)
+
+    class Config:
+        orm_mode = True
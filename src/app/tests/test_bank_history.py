@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, Tuple
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app import crud, models
+from app.core.cache import bank_history_cache
+from app.core.config import settings
+from app.crud.bank import bucket_start
+from app.db.session import SessionLocal
+from app.utils import HistoryBucketEnum, StatusEnum
+
+
+def test_bucket_start_matches_date_trunc():
+    # A Thursday
+    dt = datetime(2021, 9, 16, 13, 45, 12, 500)
+    assert bucket_start(HistoryBucketEnum.DAY, dt) == datetime(2021, 9, 16)
+    # Postgres weeks start on Monday
+    assert bucket_start(HistoryBucketEnum.WEEK, dt) == datetime(2021, 9, 13)
+    assert bucket_start(HistoryBucketEnum.MONTH, dt) == datetime(2021, 9, 1)
+    assert bucket_start(HistoryBucketEnum.WEEK, datetime(2021, 9, 1)) == datetime(
+        2021, 8, 30
+    )
+
+
+@pytest.fixture
+def bank_id() -> Iterator[uuid.UUID]:
+    company_id, bank_id = uuid.uuid4(), uuid.uuid4()
+    with SessionLocal() as db:
+        db.execute(insert(models.Company), {"id": company_id, "name": "history"})
+        db.execute(
+            insert(models.Bank),
+            {"id": bank_id, "name": "history", "company_id": company_id},
+        )
+        db.commit()
+    yield bank_id
+    with SessionLocal() as db:
+        db.execute(delete(models.Transaction).filter_by(bank_id=bank_id))
+        db.execute(delete(models.Bank).filter_by(id=bank_id))
+        db.execute(delete(models.Company).filter_by(id=company_id))
+        db.commit()
+
+
+def add_transactions(bank_id: uuid.UUID, *rows: Tuple[datetime, float]) -> None:
+    with SessionLocal() as db:
+        db.execute(
+            insert(models.Transaction),
+            [
+                {
+                    "id": uuid.uuid4(),
+                    "amount": amount,
+                    "status": StatusEnum.APPROVED,
+                    "bank_id": bank_id,
+                    "created_dt": created_dt,
+                }
+                for created_dt, amount in rows
+            ],
+        )
+        db.commit()
+
+
+def test_history_caches_closed_buckets(bank_id):
+    today = bucket_start(HistoryBucketEnum.DAY, datetime.utcnow())
+    add_transactions(
+        bank_id,
+        (today - timedelta(days=3), 10.0),
+        (today - timedelta(days=3), 5.0),
+        (today - timedelta(days=1), -4.0),
+        (today, 1.0),
+    )
+
+    async def history(**kwargs):
+        # Its own engine, the app's pool holds connections of other loops
+        engine = create_async_engine(settings.ASYNC_DATABASE_URI, poolclass=NullPool)
+        try:
+            async with AsyncSession(engine) as db:
+                return await crud.bank_async.get_history(
+                    db, bank_id=bank_id, bucket=HistoryBucketEnum.DAY, **kwargs
+                )
+        finally:
+            await engine.dispose()
+
+    expected = [
+        (today - timedelta(days=3), 15.0, 15.0),
+        (today - timedelta(days=1), -4.0, 11.0),
+        (today, 1.0, 12.0),
+    ]
+    assert asyncio.run(history()) == expected
+    assert bank_history_cache.get((bank_id, HistoryBucketEnum.DAY)) == (
+        today,
+        expected[:2],
+    )
+
+    # Served from the cached closed buckets plus a fresh current bucket
+    add_transactions(bank_id, (today, 2.0))
+    expected[2] = (today, 3.0, 14.0)
+    assert asyncio.run(history()) == expected
+
+    # Aware bounds are compared in UTC
+    start = (today - timedelta(days=1)).replace(tzinfo=timezone.utc)
+    assert asyncio.run(history(start=start)) == expected[1:]
+    end = (today + timedelta(hours=2)).replace(tzinfo=timezone(timedelta(hours=2)))
+    assert asyncio.run(history(end=end)) == expected[:2]
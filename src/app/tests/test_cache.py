@@ -0,0 +1,82 @@
+from datetime import timedelta
+import hashlib
+import time
+import uuid
+
+from fastapi import HTTPException
+import pytest
+
+from app.api import deps
+from app.core import security
+from app.core.cache import TTLCache, token_cache
+from app.core.config import Settings
+
+
+def test_ttl_cache_counts_hits_and_misses():
+    cache = TTLCache(maxsize=10, ttl=60)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_invalidate():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1)
+    cache.invalidate("a")
+    assert cache.get("a") is None
+
+
+def test_token_cache_skips_decode_until_flushed(monkeypatch):
+    token = security.create_access_token(uuid.uuid4())
+    token_cache.clear()
+    calls = []
+    decode = security.decode_access_token
+    monkeypatch.setattr(
+        security, "decode_access_token", lambda t: calls.append(t) or decode(t)
+    )
+
+    first = deps.get_token_data(token)
+    assert deps.get_token_data(token) is first
+    assert len(calls) == 1
+
+    # A ring without the token's key flushes the cache, so it is rejected
+    security.reload_keyring(
+        Settings(
+            JWT_KEYS={"new": "key"}, JWT_ACTIVE_KID="new", SECRET_KEY="another key"
+        )
+    )
+    try:
+        with pytest.raises(HTTPException):
+            deps.get_token_data(token)
+    finally:
+        security.reload_keyring()
+
+
+def test_token_cache_honors_expiry():
+    token = security.create_access_token(uuid.uuid4(), timedelta(seconds=30))
+    token_cache.clear()
+    deps.get_token_data(token)
+    key = hashlib.sha256(token.encode()).digest()
+    expires, _ = token_cache._data[key]
+    # Well short of TOKEN_CACHE_TTL
+    assert expires <= time.monotonic() + 30
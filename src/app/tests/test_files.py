@@ -0,0 +1,115 @@
+import hashlib
+import io
+import os
+
+from PIL import Image
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.api.files import (
+    REVALIDATE_CACHE_CONTROL,
+    ContentFileResponse,
+    RangeNotSatisfiable,
+    etag_matches,
+    parse_range,
+)
+from app.core import images, storage
+from app.core.config import settings
+
+CONTENT = bytes(range(256)) * 1024
+CONTENT_HASH = hashlib.sha256(CONTENT).hexdigest()
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / CONTENT_HASH
+    path.write_bytes(CONTENT)
+
+    async def download(request):
+        return ContentFileResponse(str(path), CONTENT_HASH, filename="logo.png")
+
+    return TestClient(Starlette(routes=[Route("/", download)]))
+
+
+def test_parse_range():
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+    assert parse_range("bytes=900-", 1000) == (900, 999)
+    assert parse_range("bytes=-100", 1000) == (900, 999)
+    assert parse_range("bytes=900-5000", 1000) == (900, 999)
+    assert parse_range("bytes=0-1,5-6", 1000) is None
+    assert parse_range("items=0-1", 1000) is None
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range("bytes=1000-", 1000)
+
+
+def test_etag_matches():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc", "def"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"def"', '"abc"')
+
+
+def test_full_download(client):
+    response = client.get("/")
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["etag"] == f'"{CONTENT_HASH}"'
+    assert "immutable" in response.headers["cache-control"]
+    assert response.headers["content-type"] == "image/png"
+
+
+def test_range_download(client):
+    response = client.get("/", headers={"Range": "bytes=100-199"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[100:200]
+    assert response.headers["content-range"] == f"bytes 100-199/{len(CONTENT)}"
+
+    response = client.get("/", headers={"Range": f"bytes={len(CONTENT)}-"})
+    assert response.status_code == 416
+
+    # A stale If-Range falls back to the full content
+    response = client.get(
+        "/", headers={"Range": "bytes=100-199", "If-Range": '"stale"'}
+    )
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+def test_if_none_match(client):
+    response = client.get("/", headers={"If-None-Match": f'"{CONTENT_HASH}"'})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == f'"{CONTENT_HASH}"'
+
+
+def test_revalidated_download(tmp_path):
+    path = tmp_path / CONTENT_HASH
+    path.write_bytes(CONTENT)
+
+    async def logo(request):
+        return ContentFileResponse(
+            str(path), CONTENT_HASH, cache_control=REVALIDATE_CACHE_CONTROL
+        )
+
+    client = TestClient(Starlette(routes=[Route("/", logo)]))
+    response = client.get("/")
+    assert response.headers["cache-control"] == REVALIDATE_CACHE_CONTROL
+    response = client.get("/", headers={"If-None-Match": response.headers["etag"]})
+    assert response.status_code == 304
+
+
+def test_render_variants(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "FILE_STORAGE_ROUTE", str(tmp_path))
+    upload = io.BytesIO()
+    Image.new("RGB", (512, 300), "red").save(upload, "PNG")
+    upload.seek(0)
+    content_hash, _ = storage.store(upload)
+
+    variants = images.render_variants(content_hash, [32, 256])
+    for size, (variant_hash, file_size) in variants.items():
+        with Image.open(storage.path_for(variant_hash)) as variant:
+            assert max(variant.size) == size
+            assert variant.format == images.VARIANT_FORMAT
+        assert file_size == os.path.getsize(storage.path_for(variant_hash))
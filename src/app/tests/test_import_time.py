@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Seconds importing app.main may take, from the environment since it depends
+# on the machine; the check is skipped unless set. About 1.7s on a single slow
+# core, so 2.5 leaves headroom there.
+IMPORT_TIME_BUDGET = os.environ.get("IMPORT_TIME_BUDGET")
+
+# Only needed by a few routes, imported when first used
+DEFERRED_MODULES = ("starlette_discord", "aiohttp", "PIL")
+
+
+def import_app(code: str, *args: str) -> subprocess.CompletedProcess:
+    # A database that can't be reached proves importing doesn't connect
+    env = {**os.environ, "POSTGRES_SERVER": "unreachable.invalid"}
+    env.pop("SQLMODEL_DATABASE_URI", None)
+    env.pop("ASYNC_DATABASE_URI", None)
+    return subprocess.run(
+        [sys.executable, *args, "-c", f"import app.main\n{code}"],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+    )
+
+
+def test_import_defers_heavy_modules():
+    result = import_app(
+        f"import sys; print([m for m in {DEFERRED_MODULES!r} if m in sys.modules])"
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[]"
+
+
+@pytest.mark.skipif(not IMPORT_TIME_BUDGET, reason="IMPORT_TIME_BUDGET is not set")
+def test_import_time_budget():
+    result = import_app("", "-X", "importtime")
+    assert result.returncode == 0, result.stderr
+    # "import time: <self us> | <cumulative us> | <module>", app.main's last
+    cumulative = next(
+        int(line.split("|")[1])
+        for line in reversed(result.stderr.splitlines())
+        if line.split("|")[-1].strip() == "app.main"
+    )
+    assert cumulative / 1e6 < float(IMPORT_TIME_BUDGET)
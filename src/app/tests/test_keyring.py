@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+from jose import jwt
+import pytest
+
+from app.core.config import Settings
+from app.core.security import ALGORITHM, DEFAULT_KID, Keyring, load_keyring
+
+
+def claims(**extra):
+    return {"sub": "someone", "exp": datetime.utcnow() + timedelta(minutes=5), **extra}
+
+
+def test_rotation_keeps_old_tokens_valid():
+    old = Keyring({"2024-01": "old secret"}, "2024-01")
+    token = old.encode(claims())
+    assert jwt.get_unverified_header(token)["kid"] == "2024-01"
+
+    # The new key is added first and only then made active
+    staged = Keyring({"2024-01": "old secret", "2024-07": "new secret"}, "2024-01")
+    rotated = Keyring({"2024-01": "old secret", "2024-07": "new secret"}, "2024-07")
+    new_token = rotated.encode(claims())
+    assert staged.decode(new_token)["sub"] == "someone"
+    assert rotated.decode(token)["sub"] == "someone"
+
+    retired = Keyring({"2024-07": "new secret"}, "2024-07")
+    assert retired.decode(new_token)["sub"] == "someone"
+    with pytest.raises(jwt.JWTError):
+        retired.decode(token)
+
+
+def test_tokens_without_kid_use_the_default_key():
+    token = jwt.encode(claims(), "secret key", algorithm=ALGORITHM)
+    ring = Keyring({DEFAULT_KID: "secret key", "2024-07": "new secret"}, "2024-07")
+    assert ring.decode(token)["sub"] == "someone"
+
+
+def test_rejects_forged_and_expired_tokens():
+    ring = Keyring({"k": "secret"}, "k")
+    forged = Keyring({"k": "guess"}, "k").encode(claims())
+    expired = ring.encode(claims(exp=datetime.utcnow() - timedelta(minutes=1)))
+    for token in (forged, expired, "not a token"):
+        with pytest.raises(jwt.JWTError):
+            ring.decode(token)
+
+
+def test_active_key_must_be_in_the_ring():
+    with pytest.raises(ValueError):
+        Keyring({"k": "secret"}, "missing")
+
+
+def test_several_workers_need_configured_keys(monkeypatch):
+    for name in ("SECRET_KEY", "JWT_KEYS", "JWT_KEYS_FILE"):
+        monkeypatch.delenv(name, raising=False)
+    with pytest.raises(ValueError):
+        load_keyring(Settings(WEB_CONCURRENCY=2))
+    config = Settings(WEB_CONCURRENCY=2, JWT_KEYS={"k": "secret"})
+    assert load_keyring(config).active_kid == "k"
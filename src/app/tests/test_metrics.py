@@ -0,0 +1,54 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import exc
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.core import metrics
+
+
+async def item(request):
+    metrics.record_bcrypt(0.25)
+    return PlainTextResponse("ok")
+
+
+def test_middleware_records_route_template():
+    app = Starlette(routes=[Route("/items/{id}", item)])
+    app.add_middleware(metrics.MetricsMiddleware)
+    client = TestClient(app)
+    metrics.reset()
+
+    response = client.get("/items/1")
+    client.get("/items/2")
+    client.get("/nowhere")
+
+    timing = response.headers["server-timing"]
+    assert timing.startswith("app;dur=")
+    assert "bcrypt;dur=250.000" in timing
+    text = metrics.render()
+    assert 'http_requests_total{method="GET",route="/items/{id}"} 2' in text
+    assert 'http_requests_total{method="GET",route="unmatched"} 1' in text
+    assert (
+        'http_request_duration_seconds_bucket{method="GET",route="/items/{id}",le="+Inf"} 2'
+        in text
+    )
+    assert 'bcrypt_duration_seconds_total{method="GET",route="/items/{id}"} 0.5' in text
+    metrics.reset()
+
+
+def test_pool_stats_count_waits_and_timeouts():
+    pool = metrics.InstrumentedQueuePool(
+        lambda: sqlite3.connect(":memory:"), pool_size=1, max_overflow=0, timeout=0.01
+    )
+    held = pool.connect()
+    with pytest.raises(exc.TimeoutError):
+        pool.connect()
+    stats = metrics.pool_stats(pool)
+    assert stats["checked_out"] == 1
+    assert (stats["checkouts"], stats["waits"], stats["timeouts"]) == (2, 1, 1)
+    held.close()
+    pool.connect().close()
+    assert metrics.pool_stats(pool)["waits"] == 1
@@ -0,0 +1,33 @@
+"""
+Principal cache invalidation around commits, against the database.
+"""
+import uuid
+
+from app import crud, schemas
+from app.core.cache import principal_cache
+from app.db.session import SessionLocal
+from app.utils import RankEnum
+
+
+def test_principal_invalidated_only_after_commit():
+    name = f"cache-{uuid.uuid4().hex[:8]}"
+    with SessionLocal() as db:
+        user = crud.user.create(
+            db,
+            obj_in=schemas.UserCreate(username=name, in_game_name=name, password="x"),
+        )
+        try:
+            principal_cache.set(user.id, "cached")
+            crud.user.update_rank(db, db_obj=user, rank=RankEnum.OFFICER, commit=False)
+            # Not committed, a request reading the row now still sees the old
+            # rank, so dropping the entry yet would let it be cached again
+            assert principal_cache.get(user.id) == "cached"
+            db.rollback()
+            db.commit()
+            assert principal_cache.get(user.id) == "cached"
+
+            crud.user.update_rank(db, db_obj=user, rank=RankEnum.OFFICER, commit=False)
+            db.commit()
+            assert principal_cache.get(user.id) is None
+        finally:
+            crud.user.remove(db, id=user.id)
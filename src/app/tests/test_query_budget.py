@@ -0,0 +1,109 @@
+"""
+Statement budgets for the hot endpoints.
+
+Each request runs against a small company (a few banks with transactions) and
+fails if it issues more SQL than budgeted, which catches N+1 lazy loads and
+relationships touched without a loader option.
+"""
+from typing import Any, Dict, Iterator
+import uuid
+
+from fastapi.testclient import TestClient
+import pytest
+from sqlalchemy import insert
+
+from app import crud, models, schemas
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.main import app
+from app.tests.utils import statement_budget
+from app.utils import StatusEnum
+
+API = settings.API_V1_STR
+BANKS = 3
+TRANSACTIONS_PER_BANK = 20
+
+# (method, path, statements); paths are formatted with the seeded ids.
+# Principal endpoints authenticate from the cache, which the first request
+# fills, so their budgets count the endpoint's own work only.
+BUDGETS = [
+    ("GET", "/company/", 2),
+    ("GET", "/company/summary", 1),
+    ("GET", "/bank/", 1),
+    ("GET", "/bank/{bank_id}", 1),
+    ("GET", "/transaction/", 1),
+    ("GET", "/transaction/{bank_id}/PENDING", 2),
+    ("PUT", "/transaction/{transaction_id}", 3),
+    ("DELETE", "/transaction/{deleted_id}", 3),
+]
+
+
+@pytest.fixture(scope="module")
+def seeded() -> Iterator[Dict[str, Any]]:
+    client = TestClient(app)
+    name = f"budget-{uuid.uuid4().hex[:8]}"
+    with SessionLocal() as db:
+        user = crud.user.create(
+            db,
+            obj_in=schemas.UserCreate(
+                username=name, in_game_name=name, password="budget"
+            ),
+        )
+    response = client.post(
+        f"{API}/login/access-token", data={"username": name, "password": "budget"}
+    )
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    company_id = client.post(
+        f"{API}/company/", json={"name": name}, headers=headers
+    ).json()["id"]
+    bank_ids = [
+        client.post(
+            f"{API}/bank/",
+            json={"name": f"{name}-{i}", "company_id": company_id},
+            headers=headers,
+        ).json()["id"]
+        for i in range(BANKS)
+    ]
+    transaction_ids = [uuid.uuid4() for _ in range(BANKS * TRANSACTIONS_PER_BANK)]
+    with SessionLocal() as db:
+        db.execute(
+            insert(models.Transaction),
+            [
+                {
+                    "id": id,
+                    "amount": 1.0,
+                    "status": StatusEnum.PENDING,
+                    "bank_id": bank_ids[i % BANKS],
+                    "creator_id": user.id,
+                }
+                for i, id in enumerate(transaction_ids)
+            ],
+        )
+        db.commit()
+    # Fill the principal cache
+    client.get(f"{API}/bank/", headers=headers)
+    yield {
+        "client": client,
+        "headers": headers,
+        "ids": {
+            "bank_id": bank_ids[0],
+            "transaction_id": transaction_ids[0],
+            "deleted_id": transaction_ids[1],
+        },
+    }
+    with SessionLocal() as db:
+        crud.company.remove(db, id=uuid.UUID(company_id))
+        crud.user.remove(db, id=user.id)
+
+
+@pytest.mark.parametrize("method,path,budget", BUDGETS)
+def test_endpoint_statement_budget(seeded, method, path, budget):
+    body = {"amount": 2.0} if method == "PUT" else None
+    with statement_budget(budget):
+        response = seeded["client"].request(
+            method,
+            API + path.format(**seeded["ids"]),
+            json=body,
+            headers=seeded["headers"],
+        )
+    assert response.status_code == 200, response.text
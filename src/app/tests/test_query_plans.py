@@ -0,0 +1,160 @@
+"""
+Query plan regression suite.
+
+Seeds a large dataset (inside a transaction that is rolled back afterwards),
+runs each hot CRUD query, EXPLAINs every statement it issued and fails if
+Postgres would answer it with a sequential scan over one of the big tables.
+"""
+from typing import Any, Callable, Dict, List, Tuple
+import hashlib
+import uuid
+
+import pytest
+from sqlalchemy import event, text
+
+from app import crud
+from app.crud.base import encode_cursor
+from app.db.session import SessionLocal, engine
+from app.utils import StatusEnum
+
+COMPANIES = 500
+BANKS = 5_000
+USERS = 50_000
+TRANSACTIONS = 500_000
+
+# Tables large enough in production that a sequential scan is a regression
+GUARDED_TABLES = {"user", "bank", "transaction"}
+
+SEED_SQL = [
+    """
+    INSERT INTO company (id, name, created_dt, updated_dt)
+    SELECT md5('company' || i)::uuid, 'company ' || i, now(), now()
+    FROM generate_series(1, :companies) AS i
+    """,
+    """
+    INSERT INTO bank (id, name, status, company_id, balance, created_dt, updated_dt)
+    SELECT md5('bank' || i)::uuid, 'bank ' || i, 'ACTIVE'::statusenum,
+           md5('company' || (i % :companies + 1))::uuid, 0, now(), now()
+    FROM generate_series(1, :banks) AS i
+    """,
+    """
+    INSERT INTO "user" (id, username, in_game_name, discord_id, is_active,
+                        is_superuser, company_id, status, created_dt, updated_dt)
+    SELECT md5('user' || i)::uuid, 'plan-user-' || i, 'user ' || i,
+           CASE WHEN i % 3 = 0 THEN 'plan-discord-' || i END, true, false,
+           md5('company' || (i % :companies + 1))::uuid, 'SETTLER'::rankenum,
+           now() - i * interval '1 second', now()
+    FROM generate_series(1, :users) AS i
+    """,
+    """
+    INSERT INTO transaction (id, amount, status, bank_id, creator_id,
+                             created_dt, updated_dt)
+    SELECT md5('transaction' || i)::uuid, (i % 1000) - 500,
+           (CASE WHEN i % 20 = 0 THEN 'PENDING' ELSE 'APPROVED' END)::statusenum,
+           md5('bank' || (i % :banks + 1))::uuid,
+           md5('user' || (i % :users + 1))::uuid,
+           now() - i * interval '1 second', now()
+    FROM generate_series(1, :transactions) AS i
+    """,
+    'ANALYZE company, bank, "user", transaction',
+]
+
+
+def seeded_id(kind: str, i: int) -> uuid.UUID:
+    """
+    Id of the i-th seeded row of `kind`, matching md5(kind || i)::uuid
+    """
+    return uuid.UUID(hashlib.md5(f"{kind}{i}".encode()).hexdigest())
+
+
+@pytest.fixture(scope="module")
+def db():
+    connection = engine.connect()
+    trans = connection.begin()
+    session = SessionLocal(bind=connection)
+    params = {
+        "companies": COMPANIES,
+        "banks": BANKS,
+        "users": USERS,
+        "transactions": TRANSACTIONS,
+    }
+    for statement in SEED_SQL:
+        session.execute(text(statement), params)
+    yield session
+    session.close()
+    trans.rollback()
+    connection.close()
+
+
+def capture_statements(db, call: Callable[[], Any]) -> List[Tuple[str, Any]]:
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        statements.append((statement, parameters))
+
+    connection = db.connection()
+    event.listen(connection, "before_cursor_execute", before_cursor_execute)
+    try:
+        call()
+    finally:
+        event.remove(connection, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def seq_scans(plan: Dict[str, Any]) -> List[str]:
+    found = []
+    if plan["Node Type"] == "Seq Scan" and plan["Relation Name"] in GUARDED_TABLES:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+def assert_no_seq_scan(db, call: Callable[[], Any]) -> None:
+    statements = capture_statements(db, call)
+    assert statements, "query issued no SQL"
+    cursor = db.connection().connection.cursor()
+    for statement, parameters in statements:
+        cursor.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+        plan = cursor.fetchone()[0][0]["Plan"]
+        scans = seq_scans(plan)
+        assert not scans, f"sequential scan on {scans} for:\n{statement}"
+
+
+HOT_QUERIES = {
+    "user.get": lambda db: crud.user.get(db, id=seeded_id("user", 42)),
+    "user.get_by_username": lambda db: crud.user.get_by_username(
+        db, username="plan-user-42"
+    ),
+    "user.get_by_discord_id": lambda db: crud.user.get_by_discord_id(
+        db, discord_id="plan-discord-42"
+    ),
+    "user.get_multi": lambda db: crud.user.get_multi(db, limit=100),
+    "user.get_multi_cursor": lambda db: crud.user.get_multi(
+        db, limit=100, cursor=encode_cursor(crud.user.get(db, id=seeded_id("user", 42)))
+    ),
+    "bank.get": lambda db: crud.bank.get(db, id=seeded_id("bank", 42)),
+    "bank.get_all_by_company": lambda db: crud.bank.get_all_by_company(
+        db, company_id=seeded_id("company", 42)
+    ),
+    "transaction.get": lambda db: crud.transaction.get(
+        db, id=seeded_id("transaction", 42)
+    ),
+    "transaction.get_all_by_bank_scoped.pending": lambda db: crud.transaction.get_all_by_bank_scoped(
+        db, bank=crud.bank.get(db, id=seeded_id("bank", 42)), scope=StatusEnum.PENDING
+    ),
+    "transaction.get_all_by_bank_scoped.approved": lambda db: crud.transaction.get_all_by_bank_scoped(
+        db, bank=crud.bank.get(db, id=seeded_id("bank", 42)), scope=StatusEnum.APPROVED
+    ),
+    "transaction.get_multi_by_company_scoped": lambda db: crud.transaction.get_multi_by_company_scoped(
+        db,
+        company=crud.company.get(db, id=seeded_id("company", 42)),
+        scope=StatusEnum.APPROVED,
+        limit=100,
+    ),
+}
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_query_uses_index(db, name):
+    assert_no_seq_scan(db, lambda: HOT_QUERIES[name](db))
@@ -0,0 +1,43 @@
+from datetime import datetime
+from typing import List
+import json
+import uuid
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import parse_obj_as
+
+from app import models, schemas
+from app.api.rows import RowEncoder, RowsResponse
+from app.utils import StatusEnum
+
+
+def test_row_encoder_matches_response_model():
+    transactions = [
+        models.Transaction(
+            id=uuid.uuid4(),
+            amount=amount,
+            status=StatusEnum.APPROVED,
+            bank_id=uuid.uuid4(),
+            creator_id=uuid.uuid4(),
+            approver_id=approver_id,
+            created_dt=datetime(2021, 9, 1, 12, 30, 0, 125),
+            updated_dt=datetime(2021, 9, 2),
+        )
+        for amount, approver_id in [(10.5, uuid.uuid4()), (-3, None), (1e16, None)]
+    ]
+    encoder = RowEncoder(schemas.Transaction)
+    rows = [
+        tuple(getattr(transaction, column) for column in encoder.columns)
+        for transaction in transactions
+    ]
+
+    slow = JSONResponse(
+        jsonable_encoder(parse_obj_as(List[schemas.Transaction], transactions))
+    )
+    fast = RowsResponse(encoder.encode(rows))
+    assert json.loads(fast.body) == json.loads(slow.body)
+    # Same key order too
+    assert [list(item) for item in json.loads(fast.body)] == [
+        list(item) for item in json.loads(slow.body)
+    ]
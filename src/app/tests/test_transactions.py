@@ -0,0 +1,98 @@
+"""
+Transaction writes that touch bank balances, against the database.
+"""
+from typing import Any, Dict, Iterator
+import uuid
+
+from fastapi.testclient import TestClient
+import pytest
+
+from app import crud, schemas
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.main import app
+
+API = settings.API_V1_STR
+
+
+@pytest.fixture(scope="module")
+def company() -> Iterator[Dict[str, Any]]:
+    client = TestClient(app)
+    name = f"transactions-{uuid.uuid4().hex[:8]}"
+    with SessionLocal() as db:
+        user = crud.user.create(
+            db,
+            obj_in=schemas.UserCreate(
+                username=name, in_game_name=name, password="transactions"
+            ),
+        )
+    response = client.post(
+        f"{API}/login/access-token",
+        data={"username": name, "password": "transactions"},
+    )
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    company_id = client.post(
+        f"{API}/company/", json={"name": name}, headers=headers
+    ).json()["id"]
+    bank_id = client.post(
+        f"{API}/bank/", json={"name": name, "company_id": company_id}, headers=headers
+    ).json()["id"]
+    yield {"client": client, "headers": headers, "bank_id": bank_id}
+    with SessionLocal() as db:
+        crud.company.remove(db, id=uuid.UUID(company_id))
+        crud.user.remove(db, id=user.id)
+
+
+def balance(company: Dict[str, Any]) -> float:
+    response = company["client"].get(
+        f"{API}/bank/{company['bank_id']}", headers=company["headers"]
+    )
+    return response.json()["balance"]
+
+
+def test_create_ignores_client_status(company):
+    before = balance(company)
+    response = company["client"].post(
+        f"{API}/transaction/{company['bank_id']}",
+        json={"amount": 5.0, "status": "APPROVED"},
+        headers=company["headers"],
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["status"] == "PENDING"
+    assert balance(company) == before
+
+
+def test_bulk_create_is_always_pending(company):
+    before = balance(company)
+    response = company["client"].post(
+        f"{API}/transaction/bulk",
+        json=[
+            {"bank_id": company["bank_id"], "amount": 3.0, "status": "APPROVED"}
+            for _ in range(3)
+        ],
+        headers=company["headers"],
+    )
+    assert response.status_code == 200, response.text
+    assert {row["status"] for row in response.json()} == {"PENDING"}
+    assert balance(company) == before
+
+
+def test_approve_adds_to_balance_once(company):
+    before = balance(company)
+    ids = [
+        company["client"]
+        .post(
+            f"{API}/transaction/{company['bank_id']}",
+            json={"amount": amount},
+            headers=company["headers"],
+        )
+        .json()["id"]
+        for amount in (2.0, 4.5)
+    ]
+    for _ in range(2):
+        response = company["client"].put(
+            f"{API}/transaction/approve", json={"ids": ids}, headers=company["headers"]
+        )
+        assert response.status_code == 200, response.text
+    assert sorted(response.json()["not_pending"]) == sorted(ids)
+    assert balance(company) == before + 6.5
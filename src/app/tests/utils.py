@@ -0,0 +1,36 @@
+from contextlib import contextmanager
+from typing import Iterator, List
+
+from sqlalchemy import event
+
+from app.db.session import async_engine, engine
+
+
+@contextmanager
+def statement_budget(budget: int) -> Iterator[List[str]]:
+    """
+    Count the SQL statements both engines run inside the block and fail when
+    there are more than `budget`. The failure lists every statement, which
+    usually points straight at the lazy load or loop responsible.
+
+        with statement_budget(2):
+            client.get("/api/v1/bank/", headers=headers)
+    """
+    statements: List[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        statements.append(statement)
+
+    targets = [engine, async_engine.sync_engine]
+    for target in targets:
+        event.listen(target, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        for target in targets:
+            event.remove(target, "before_cursor_execute", before_cursor_execute)
+    assert (
+        len(statements) <= budget
+    ), f"{len(statements)} statements, budget is {budget}:\n" + "\n---\n".join(
+        statements
+    )
@@ -14,3 +14,15 @@ class RankEnum(IntEnum):
     OFFICER = 2
     CONSUL = 3
     GOVERNOR = 4
+
+
+class ExportFormatEnum(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+# Values are Postgres date_trunc fields
+class HistoryBucketEnum(str, Enum):
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
@@ -0,0 +1,61 @@
+"""
+Per-request cost of checking the bearer token in the auth dependencies.
+
+Runs in process with no server or database: deps.get_token_data is called
+with the token cache emptied before every call (a full jwt.decode, as before
+the cache) and with the token already cached. Prints the median and p95
+microseconds of each as JSON.
+
+    python -m benchmarks.auth_overhead --requests 20000
+"""
+from typing import Callable, Dict
+import argparse
+import json
+import time
+import uuid
+
+from app.api import deps
+from app.core import security
+from app.core.cache import token_cache
+from benchmarks.stats import percentile
+
+
+def time_calls(fn: Callable[[], None], requests: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {
+        "p50_us": round(percentile(samples, 50) * 1e6, 2),
+        "p95_us": round(percentile(samples, 95) * 1e6, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    token = security.create_access_token(uuid.uuid4())
+
+    def uncached() -> None:
+        token_cache.clear()
+        deps.get_token_data(token)
+
+    def cached() -> None:
+        deps.get_token_data(token)
+
+    decode = time_calls(uncached, args.requests)
+    hit = time_calls(cached, args.requests)
+    result = {
+        "requests": args.requests,
+        "jwt_decode": decode,
+        "cache_hit": hit,
+        "speedup": round(decode["p50_us"] / hit["p50_us"], 1),
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
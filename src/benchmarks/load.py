@@ -0,0 +1,416 @@
+"""
+Load test of the API under a mix of realistic scenarios.
+
+Seeds a dataset of companies x members x banks x transactions into the
+configured Postgres, if --seed names that database, serves app.main:app with
+uvicorn (or targets --url), and has --concurrency virtual users run weighted
+scenarios for --duration seconds: logging in, loading the dashboard, paging
+through transactions, creating and approving transactions, and exporting.
+Prints the throughput and p50/p95/p99 of every endpoint, plus the error count,
+as JSON.
+
+    python -m benchmarks.load --seed loadtest --companies 50 --members 20 \\
+        --banks 5 --transactions 2000 --concurrency 32 --duration 30
+"""
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import argparse
+import asyncio
+import json
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import aiohttp
+from sqlalchemy import text
+
+from benchmarks.stats import summarize
+
+# Relative weight of each scenario in the mix
+SCENARIO_WEIGHTS = {
+    "login": 1,
+    "dashboard": 10,
+    "paging": 6,
+    "write": 3,
+    "export": 1,
+}
+
+# Seeded rows are recognized by their ids, which the seed derives from their
+# names, so real rows that merely look alike are never touched
+LOAD_COMPANIES = """
+    SELECT id FROM company
+    WHERE name LIKE 'load company %'
+      AND id = md5('load-company' || substr(name, 14))::uuid
+"""
+LOAD_USERS = """
+    SELECT id FROM "user"
+    WHERE username LIKE 'load-%'
+      AND id = md5('load-user' || substr(username, 6))::uuid
+"""
+LOAD_BANKS = f"""
+    SELECT bank.id FROM bank JOIN company ON bank.company_id = company.id
+    WHERE company.id IN ({LOAD_COMPANIES})
+      AND bank.id = md5(
+          'load-bank' || substr(company.name, 14) || '-' || substr(bank.name, 11)
+      )::uuid
+"""
+
+SEED_SQL = [
+    # Foreign keys have no ON DELETE CASCADE, so children go first. Anything
+    # else referencing seeded rows is detached rather than deleted.
+    f"DELETE FROM transaction WHERE bank_id IN ({LOAD_BANKS})",
+    f"UPDATE transaction SET creator_id = NULL WHERE creator_id IN ({LOAD_USERS})",
+    f"UPDATE transaction SET approver_id = NULL WHERE approver_id IN ({LOAD_USERS})",
+    f"DELETE FROM bank WHERE id IN ({LOAD_BANKS})",
+    f'DELETE FROM "user" WHERE id IN ({LOAD_USERS})',
+    f'UPDATE "user" SET company_id = NULL WHERE company_id IN ({LOAD_COMPANIES})',
+    f"DELETE FROM company WHERE id IN ({LOAD_COMPANIES})",
+    """
+    INSERT INTO company (id, name, created_dt, updated_dt)
+    SELECT md5('load-company' || c)::uuid, 'load company ' || c, now(), now()
+    FROM generate_series(1, :companies) AS c
+    """,
+    """
+    INSERT INTO "user" (id, username, in_game_name, hashed_password, is_active,
+                        is_superuser, company_id, status, created_dt, updated_dt)
+    SELECT md5('load-user' || c || '-' || m)::uuid, 'load-' || c || '-' || m,
+           'load ' || c || '-' || m, :hashed_password, true, false,
+           md5('load-company' || c)::uuid,
+           (CASE WHEN m = 1 THEN 'GOVERNOR'
+                 WHEN m % 10 = 0 THEN 'CONSUL'
+                 WHEN m % 3 = 0 THEN 'OFFICER'
+                 ELSE 'SETTLER' END)::rankenum,
+           now(), now()
+    FROM generate_series(1, :companies) AS c, generate_series(1, :members) AS m
+    """,
+    """
+    INSERT INTO bank (id, name, status, company_id, balance, created_dt, updated_dt)
+    SELECT md5('load-bank' || c || '-' || b)::uuid, 'load bank ' || b,
+           'ACTIVE'::statusenum, md5('load-company' || c)::uuid, 0,
+           now() - b * interval '1 day', now()
+    FROM generate_series(1, :companies) AS c, generate_series(1, :banks) AS b
+    """,
+    """
+    INSERT INTO transaction (id, amount, status, bank_id, creator_id,
+                             created_dt, updated_dt)
+    SELECT md5('load-transaction' || c || '-' || b || '-' || t)::uuid,
+           ((c * 7 + b * 13 + t * 31) % 2000 - 1000) / 4.0,
+           (CASE WHEN t % 10 = 0 THEN 'PENDING' ELSE 'APPROVED' END)::statusenum,
+           md5('load-bank' || c || '-' || b)::uuid,
+           md5('load-user' || c || '-' || (t % :members + 1))::uuid,
+           now() - t * interval '1 minute', now()
+    FROM generate_series(1, :companies) AS c, generate_series(1, :banks) AS b,
+         generate_series(1, :transactions) AS t
+    """,
+    """
+    UPDATE bank SET balance = totals.amount
+    FROM (
+        SELECT bank_id, sum(amount) AS amount FROM transaction
+        WHERE status = 'APPROVED' GROUP BY bank_id
+    ) AS totals
+    WHERE bank.id = totals.bank_id AND bank.name LIKE 'load bank %'
+    """,
+    'ANALYZE company, bank, "user", transaction',
+]
+
+
+def seed(args: argparse.Namespace) -> None:
+    """
+    Replace any previously seeded load test data. Every member's password is
+    --password, hashed once up front.
+    """
+    from app.core.security import pwd_context
+    from app.db.session import engine
+
+    if engine.url.database != args.seed:
+        sys.exit(
+            f"Refusing to seed: the configured database is "
+            f"{engine.url.database!r}, not {args.seed!r}"
+        )
+    params = {
+        "companies": args.companies,
+        "members": args.members,
+        "banks": args.banks,
+        "transactions": args.transactions,
+        "hashed_password": pwd_context.hash(args.password),
+    }
+    with engine.begin() as connection:
+        for statement in SEED_SQL:
+            connection.execute(text(statement), params)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_up(url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while True:
+            try:
+                async with session.get(url + "/") as response:
+                    if response.status < 500:
+                        return
+            except aiohttp.ClientError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"server at {url} did not come up")
+            await asyncio.sleep(0.2)
+
+
+class VirtualUser:
+    """
+    One client session logged in as the governor of a seeded company, so it
+    may run every scenario
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        args: argparse.Namespace,
+        company: int,
+        samples: Dict[str, List[float]],
+        errors: Dict[str, int],
+    ) -> None:
+        self.session = session
+        self.args = args
+        self.company = company
+        self.samples = samples
+        self.errors = errors
+        self.headers: Dict[str, str] = {}
+        self.bank_ids: List[str] = []
+        self.recording = False
+
+    async def request(
+        self, label: str, method: str, path: str, **kwargs: Any
+    ) -> Optional[Any]:
+        start = time.perf_counter()
+        async with self.session.request(
+            method,
+            self.args.url + self.args.prefix + path,
+            headers=self.headers,
+            **kwargs,
+        ) as response:
+            body = await response.read()
+        if self.recording:
+            self.samples[label].append(time.perf_counter() - start)
+            if response.status >= 400:
+                self.errors[label] += 1
+        if response.status >= 400 or not body:
+            return None
+        if response.content_type == "application/json":
+            return json.loads(body)
+        return body
+
+    async def login(self, member: int = 1) -> Optional[str]:
+        token = await self.request(
+            "POST /login/access-token",
+            "POST",
+            "/login/access-token",
+            data={
+                "username": f"load-{self.company}-{member}",
+                "password": self.args.password,
+            },
+        )
+        return token and token["access_token"]
+
+    async def setup(self) -> None:
+        self.headers = {"Authorization": f"Bearer {await self.login()}"}
+        banks = await self.request("GET /bank/", "GET", "/bank/") or []
+        self.bank_ids = [bank["id"] for bank in banks]
+
+    async def scenario_login(self) -> None:
+        await self.login(random.randint(1, self.args.members))
+
+    async def scenario_dashboard(self) -> None:
+        await self.request("GET /company/summary", "GET", "/company/summary")
+        await self.request("GET /bank/", "GET", "/bank/")
+
+    async def scenario_paging(self) -> None:
+        cursor = None
+        for _ in range(self.args.pages):
+            params = {"limit": 100, **({"cursor": cursor} if cursor else {})}
+            page = await self.request(
+                "GET /transaction/", "GET", "/transaction/", params=params
+            )
+            cursor = page and page["next_cursor"]
+            if not cursor:
+                break
+
+    async def scenario_write(self) -> None:
+        if not self.bank_ids:
+            return
+        transaction = await self.request(
+            "POST /transaction/{bank_id}",
+            "POST",
+            f"/transaction/{random.choice(self.bank_ids)}",
+            json={"amount": round(random.uniform(-500, 500), 2)},
+        )
+        if transaction:
+            await self.request(
+                "PUT /transaction/{id}/approve",
+                "PUT",
+                f"/transaction/{transaction['id']}/approve",
+            )
+
+    async def scenario_export(self) -> None:
+        await self.request(
+            "GET /transaction/export",
+            "GET",
+            "/transaction/export",
+            params={"format": "ndjson"},
+        )
+
+
+async def run_user(user: VirtualUser, scenarios: List[str], deadline: float) -> None:
+    weights = [SCENARIO_WEIGHTS[name] for name in scenarios]
+    while time.monotonic() < deadline:
+        name = random.choices(scenarios, weights)[0]
+        await getattr(user, f"scenario_{name}")()
+
+
+async def drive(args: argparse.Namespace) -> Dict[str, Any]:
+    samples: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        users = [
+            VirtualUser(session, args, i % args.companies + 1, samples, errors)
+            for i in range(args.concurrency)
+        ]
+        await asyncio.gather(*[user.setup() for user in users])
+
+        async def phase(seconds: float) -> None:
+            deadline = time.monotonic() + seconds
+            await asyncio.gather(
+                *[run_user(user, args.scenarios, deadline) for user in users]
+            )
+
+        await phase(args.warmup)
+        for user in users:
+            user.recording = True
+        started = time.monotonic()
+        await phase(args.duration)
+        elapsed = time.monotonic() - started
+
+    endpoints = {
+        label: {**summarize(samples[label], elapsed), "errors": errors[label]}
+        for label in sorted(samples)
+    }
+    total = sum(len(values) for values in samples.values())
+    return {
+        "total": {
+            "requests": total,
+            "throughput": round(total / elapsed, 2),
+            "errors": sum(errors.values()),
+        },
+        "endpoints": endpoints,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--seed",
+        metavar="DATABASE",
+        help="(re)seed the dataset into the configured database, which must "
+        "have this name",
+    )
+    parser.add_argument("--companies", type=int, default=20)
+    parser.add_argument("--members", type=int, default=10)
+    parser.add_argument("--banks", type=int, default=3)
+    parser.add_argument(
+        "--transactions", type=int, default=1000, help="transactions per bank"
+    )
+    parser.add_argument("--password", default="load-test")
+    parser.add_argument(
+        "--url", help="target a running server instead of starting uvicorn"
+    )
+    parser.add_argument("--prefix", default="/api/v1")
+    parser.add_argument(
+        "--workers", type=int, default=1, help="uvicorn workers when started here"
+    )
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=5.0)
+    parser.add_argument("--pages", type=int, default=5, help="pages per paging run")
+    parser.add_argument(
+        "--scenarios",
+        nargs="+",
+        choices=sorted(SCENARIO_WEIGHTS),
+        default=sorted(SCENARIO_WEIGHTS),
+    )
+    parser.add_argument(
+        "--random-seed", type=int, default=0, help="seed of the scenario mix"
+    )
+    args = parser.parse_args()
+    random.seed(args.random_seed)
+
+    if args.seed:
+        seed(args)
+
+    server = None
+    if args.url is None:
+        port = free_port()
+        args.url = f"http://127.0.0.1:{port}"
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "app.main:app",
+                "--host",
+                "127.0.0.1",
+                "--port",
+                str(port),
+                "--workers",
+                str(args.workers),
+                "--no-access-log",
+            ]
+        )
+    try:
+        asyncio.run(wait_until_up(args.url))
+        result = asyncio.run(drive(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    report = {
+        "commit": git_commit(),
+        "config": {
+            key: getattr(args, key)
+            for key in (
+                "companies",
+                "members",
+                "banks",
+                "transactions",
+                "workers",
+                "concurrency",
+                "duration",
+                "scenarios",
+            )
+        },
+        **result,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
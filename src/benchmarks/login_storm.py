@@ -0,0 +1,112 @@
+"""
+p99 latency of a non-login endpoint while logins hammer the server.
+
+Runs two phases against a live server: readers alone, then the same readers
+alongside a login storm, and prints the reader latency of each phase (plus
+the login status codes) as JSON.
+
+    python -m benchmarks.login_storm --url http://localhost:8000 \\
+        --username admin --password secret
+"""
+from collections import Counter
+from typing import Dict, List
+import argparse
+import asyncio
+import json
+import time
+
+import aiohttp
+
+from benchmarks.stats import summarize
+
+
+async def login(session: aiohttp.ClientSession, args: argparse.Namespace) -> int:
+    async with session.post(
+        f"{args.url}{args.prefix}/login/access-token",
+        data={"username": args.username, "password": args.password},
+    ) as response:
+        await response.read()
+        if response.status == 503:
+            # Back off like a well-behaved client would
+            await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+        return response.status
+
+
+async def reader(
+    session: aiohttp.ClientSession,
+    args: argparse.Namespace,
+    headers: Dict[str, str],
+    deadline: float,
+    samples: List[float],
+) -> None:
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        async with session.get(
+            f"{args.url}{args.prefix}{args.read_path}", headers=headers
+        ) as response:
+            await response.read()
+        samples.append(time.perf_counter() - start)
+
+
+async def stormer(
+    session: aiohttp.ClientSession,
+    args: argparse.Namespace,
+    deadline: float,
+    statuses: Counter,
+) -> None:
+    while time.monotonic() < deadline:
+        statuses[await login(session, args)] += 1
+
+
+async def phase(
+    session: aiohttp.ClientSession,
+    args: argparse.Namespace,
+    headers: Dict[str, str],
+    storm: bool,
+) -> Dict:
+    deadline = time.monotonic() + args.duration
+    samples: List[float] = []
+    statuses: Counter = Counter()
+    tasks = [
+        reader(session, args, headers, deadline, samples) for _ in range(args.readers)
+    ]
+    if storm:
+        tasks += [
+            stormer(session, args, deadline, statuses) for _ in range(args.logins)
+        ]
+    await asyncio.gather(*tasks)
+    result = {"reads": summarize(samples, args.duration)}
+    if storm:
+        result["logins"] = {str(code): count for code, count in statuses.items()}
+    return result
+
+
+async def main(args: argparse.Namespace) -> None:
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async with session.post(
+            f"{args.url}{args.prefix}/login/access-token",
+            data={"username": args.username, "password": args.password},
+        ) as response:
+            token = (await response.json())["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        report = {
+            "read_path": args.read_path,
+            "baseline": await phase(session, args, headers, storm=False),
+            "login_storm": await phase(session, args, headers, storm=True),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--prefix", default="/api/v1")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--read-path", default="/users/me")
+    parser.add_argument("--readers", type=int, default=10)
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=15.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,102 @@
+"""
+Per-request cost of the metrics instrumentation.
+
+Runs in process with no server or database: a minimal ASGI endpoint is called
+bare and through MetricsMiddleware, and the engine hooks are called for a
+statement inside a request. Prints the median and p95 microseconds of each
+as JSON.
+
+    python -m benchmarks.metrics_overhead --requests 20000
+"""
+from types import SimpleNamespace
+from typing import Any, Callable, Dict
+import argparse
+import asyncio
+import json
+import time
+
+from app.core import metrics
+from benchmarks.stats import percentile
+
+
+async def endpoint(scope, receive, send) -> None:
+    # What the router does on a match, then the smallest possible response
+    scope["endpoint"] = endpoint
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+def make_scope() -> Dict[str, Any]:
+    return {
+        "type": "http",
+        "method": "GET",
+        "path": "/bench",
+        "app": SimpleNamespace(
+            routes=[SimpleNamespace(endpoint=endpoint, path="/bench")]
+        ),
+    }
+
+
+async def receive() -> Dict[str, Any]:
+    return {"type": "http.request", "body": b""}
+
+
+async def send(message: Dict[str, Any]) -> None:
+    pass
+
+
+def time_requests(app: Callable, requests: int) -> Dict[str, float]:
+    async def run():
+        samples = []
+        for _ in range(requests):
+            scope = make_scope()
+            start = time.perf_counter()
+            await app(scope, receive, send)
+            samples.append(time.perf_counter() - start)
+        return samples
+
+    samples = asyncio.run(run())
+    return {
+        "p50_us": round(percentile(samples, 50) * 1e6, 2),
+        "p95_us": round(percentile(samples, 95) * 1e6, 2),
+    }
+
+
+def time_statement_hooks(statements: int) -> Dict[str, float]:
+    context = SimpleNamespace()
+    token = metrics._current.set(metrics.RequestMetrics())
+    samples = []
+    try:
+        for _ in range(statements):
+            start = time.perf_counter()
+            metrics._before_cursor_execute(None, None, "", None, context, False)
+            metrics._after_cursor_execute(None, None, "", None, context, False)
+            samples.append(time.perf_counter() - start)
+    finally:
+        metrics._current.reset(token)
+    return {
+        "p50_us": round(percentile(samples, 50) * 1e6, 2),
+        "p95_us": round(percentile(samples, 95) * 1e6, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    bare = time_requests(endpoint, args.requests)
+    instrumented = time_requests(metrics.MetricsMiddleware(endpoint), args.requests)
+    metrics.reset()
+    result = {
+        "requests": args.requests,
+        "bare": bare,
+        "middleware": instrumented,
+        "middleware_overhead_p50_us": round(instrumented["p50_us"] - bare["p50_us"], 2),
+        "statement_hooks": time_statement_hooks(args.requests),
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
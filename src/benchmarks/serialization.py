@@ -0,0 +1,103 @@
+"""
+CPU cost of serializing a page of transactions through the response_model
+path (Pydantic validation of ORM objects, then jsonable_encoder and
+JSONResponse) versus the row fast path (RowEncoder and RowsResponse).
+
+Runs in process on synthetic data, no server or database needed, and prints
+the median and p95 milliseconds per page for each path and page size as JSON.
+
+    python -m benchmarks.serialization --sizes 100 1000 10000
+"""
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app import models, schemas
+from app.api.rows import RowEncoder, RowsResponse
+from app.utils import StatusEnum
+from benchmarks.stats import percentile
+
+
+def make_transactions(count: int) -> List[models.Transaction]:
+    bank_id, creator_id = uuid.uuid4(), uuid.uuid4()
+    start = datetime(2021, 1, 1)
+    return [
+        models.Transaction(
+            id=uuid.uuid4(),
+            amount=(i % 1000) - 500.25,
+            status=StatusEnum.APPROVED if i % 20 else StatusEnum.PENDING,
+            bank_id=bank_id,
+            creator_id=creator_id,
+            approver_id=creator_id if i % 20 else None,
+            created_dt=start + timedelta(seconds=i),
+            updated_dt=start + timedelta(seconds=i),
+        )
+        for i in range(count)
+    ]
+
+
+def time_runs(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+    }
+
+
+def run(size: int, repeat: int) -> Dict[str, Any]:
+    transactions = make_transactions(size)
+    encoder = RowEncoder(schemas.Transaction)
+    # What a column-projected select() hands back
+    rows = [
+        tuple(getattr(transaction, column) for column in encoder.columns)
+        for transaction in transactions
+    ]
+    field = create_response_field(name="Response", type_=List[schemas.Transaction])
+    loop = asyncio.new_event_loop()
+
+    def response_model_path() -> bytes:
+        content = loop.run_until_complete(
+            serialize_response(field=field, response_content=transactions)
+        )
+        return JSONResponse(content).body
+
+    def row_path() -> bytes:
+        return RowsResponse(encoder.encode(rows)).body
+
+    assert json.loads(response_model_path()) == json.loads(row_path())
+    result = {
+        "rows": size,
+        "response_model": time_runs(response_model_path, repeat),
+        "rows_orjson": time_runs(row_path, repeat),
+    }
+    loop.close()
+    result["speedup"] = round(
+        result["response_model"]["p50_ms"] / result["rows_orjson"]["p50_ms"], 1
+    )
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument(
+        "--repeat", type=int, default=20, help="timed runs per path and size"
+    )
+    args = parser.parse_args()
+    print(json.dumps([run(size, args.repeat) for size in args.sizes], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+from typing import Dict, List
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of `samples` (pct in 0-100)
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(samples: List[float], duration: float) -> Dict[str, float]:
+    """
+    Throughput and latency percentiles (milliseconds) of one sample set
+    """
+    return {
+        "requests": len(samples),
+        "throughput": round(len(samples) / duration, 2) if duration else 0.0,
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+    }